@@ -965,6 +965,7 @@ def initialize_chat_session():
         print(f"🎯 [DEBUG] Session created: {session_id}")
         
         # Initialize DuckDB
+        db_manager = None
         try:
             print("🗄️ [DEBUG] Initializing DuckDB...")
             db_manager = DuckDBManager(session_id, session_data['db_path'])
@@ -981,9 +982,6 @@ def initialize_chat_session():
                 'file_id': data.get('file_id')  # Store file_id if provided
             })
             
-            # Close DB connection (will be reopened for each query)
-            db_manager.close()
-            
             print(f"✅ [SUCCESS] Chat session initialized: {session_id} with {load_result}")
             
             return jsonify({
@@ -997,8 +995,15 @@ def initialize_chat_session():
             # Clean up on failure
             print(f"❌ [ERROR] Database initialization failed: {e}")
             print(f"Traceback: {traceback.format_exc()}")
+            # Release the connection before the session database is dropped
+            if db_manager is not None:
+                db_manager.close()
             session_manager.delete_session(session_id)
             return jsonify({'error': f'Database initialization failed: {str(e)}'}), 500
+        finally:
+            # Return the pooled connection on every path (reopened for each query)
+            if db_manager is not None:
+                db_manager.close()
         
     except Exception as e:
         print(f"❌ [ERROR] Failed to initialize chat session: {e}")
@@ -1024,44 +1029,46 @@ def process_chat_query(session_id):
         print(f"🔍 [CHAT] Processing query: '{query}'")
         # Initialize database connection
         db_manager = DuckDBManager(session_id, session['db_path'])
-        # Get table schemas for SQL agent
-        print("🗄️ [CHAT] Getting table schemas...")
-        table_schemas = db_manager.get_table_info()
-        print(f"📊 [CHAT] Available tables: {list(table_schemas.keys())}")
-        # Initialize SQL agent
-        print("🤖 [CHAT] Initializing SQL agent...")
-        sql_agent = create_sql_agent(db_manager, session_id, 3, None, True)
-        # Process query through SQL agent
-        print("⚡ [CHAT] Processing query through SQL agent...")
-        agent_result = sql_agent.process_query(query)
-        # Update session
-        session_manager.update_session(session_id, {
-            'message_count': session.get('message_count', 0) + 1,
-            'last_query': query
-        })
-        # Format results for response
-        if agent_result['success']:
-            print("✅ [CHAT] Query processed successfully")
-            result = {
-                'status': 'success',
-                'response': agent_result['answer'],
-                'sql_query': agent_result['metadata'].get('sql_query'),
-                'total_rows': agent_result.get('metadata', {}).get('row_count', 0)
-            }
-            # Handle table data separately
-            if 'table_rows' in agent_result and agent_result['table_rows']:
-                result['table_data'] = agent_result['table_rows']
-                result['total_rows'] = len(agent_result['table_rows'])
-                print(f"📊 [CHAT] Sending {len(agent_result['table_rows'])} data rows")
-        else:
-            print(f"❌ [CHAT] Query processing failed: {agent_result.get('error', 'Unknown error')}")
-            result = {
-                'status': 'error',
-                'response': agent_result['answer'],
-                'error': agent_result.get('error', 'Query processing failed')
-            }
-        # Close database connection
-        db_manager.close()
+        try:
+            # Initialize SQL agent
+            print("🤖 [CHAT] Initializing SQL agent...")
+            sql_agent = create_sql_agent(db_manager, session_id, 3, None, True)
+            # Table info is cached per session database by the agent (re-read only when the schema changes)
+            print("🗄️ [CHAT] Getting table schemas...")
+            table_schemas = sql_agent.get_table_schemas()
+            print(f"📊 [CHAT] Available tables: {list(table_schemas.keys())}")
+            # Process query through SQL agent
+            print("⚡ [CHAT] Processing query through SQL agent...")
+            agent_result = sql_agent.process_query(query)
+            # Update session
+            session_manager.update_session(session_id, {
+                'message_count': session.get('message_count', 0) + 1,
+                'last_query': query
+            })
+            # Format results for response
+            if agent_result['success']:
+                print("✅ [CHAT] Query processed successfully")
+                result = {
+                    'status': 'success',
+                    'response': agent_result['answer'],
+                    'sql_query': agent_result['metadata'].get('sql_query'),
+                    'total_rows': agent_result.get('metadata', {}).get('row_count', 0)
+                }
+                # Handle table data separately
+                if 'table_rows' in agent_result and agent_result['table_rows']:
+                    result['table_data'] = agent_result['table_rows']
+                    result['total_rows'] = len(agent_result['table_rows'])
+                    print(f"📊 [CHAT] Sending {len(agent_result['table_rows'])} data rows")
+            else:
+                print(f"❌ [CHAT] Query processing failed: {agent_result.get('error', 'Unknown error')}")
+                result = {
+                    'status': 'error',
+                    'response': agent_result['answer'],
+                    'error': agent_result.get('error', 'Query processing failed')
+                }
+        finally:
+            # Return the pooled connections even when the agent raises
+            db_manager.close()
         return jsonify(result), 200
     except Exception as e:
         print(f"❌ [ERROR] Failed to process query: {e}")
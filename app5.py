@@ -1114,14 +1114,17 @@ def chat_init(project_id):
 
         session_id, session_data = sessions.create_session_with_id(project_id, clean_csv, error_csv)
         db = DuckDBManager(session_id, session_data['db_path'])
-        load_result = db.load_csv_data(clean_csv, error_csv)
+        try:
+            load_result = db.load_csv_data(clean_csv, error_csv)
 
-        # Update last accessed timestamp for cleanup tracking
-        db.update_last_accessed()
+            # Update last accessed timestamp for cleanup tracking
+            db.update_last_accessed()
+        finally:
+            # Return the pooled connection even when loading fails
+            db.close()
 
         sessions.update_session(session_id, {'status': 'active', 'database_info': load_result})
         firestore.set_project_session(project_id, session_id)
-        db.close()
 
         # Create a new chat if none exists or get active chat
         try:
@@ -1183,11 +1186,14 @@ def chat_query_route(project_id):
 
     try:
         db = DuckDBManager(session_id, session['db_path'])
-        agent = create_openrouter_sql_agent(db, session_id, 3)
-        result = agent.process_query(query)
+        try:
+            agent = create_openrouter_sql_agent(db, session_id, 3)
+            result = agent.process_query(query)
+        finally:
+            # Return the pooled connections even when the agent raises
+            db.close()
 
         sessions.update_session(session_id, {'message_count': session.get('message_count', 0) + 1})
-        db.close()
 
         # Save user message to Firestore
         chat_service.save_message(
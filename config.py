@@ -87,9 +87,13 @@ class Config:
     OPENAI_EXECUTION_MODEL = os.getenv('OPENAI_EXECUTION_MODEL', OPENAI_MODEL)  # Default to existing model
     OPENAI_EXECUTION_TEMPERATURE = float(os.getenv('OPENAI_EXECUTION_TEMPERATURE', '0.1'))
     OPENAI_EXECUTION_MAX_TOKENS = int(os.getenv('OPENAI_EXECUTION_MAX_TOKENS', str(OPENAI_MAX_TOKENS)))
+    # Completion cap for SQL generation (statement plus answer template) and other short structured outputs
+    OPENAI_SQL_MAX_TOKENS = int(os.getenv('OPENAI_SQL_MAX_TOKENS', '1024'))
     
     # Answer generation temperature (for more natural responses)
     OPENAI_ANSWER_TEMPERATURE = float(os.getenv('OPENAI_ANSWER_TEMPERATURE', '0.3'))
+    # Completion cap for the natural-language answer
+    OPENAI_ANSWER_MAX_TOKENS = int(os.getenv('OPENAI_ANSWER_MAX_TOKENS', '2000'))
     
     # ========================================================================
     # DUAL LLM WORKFLOW CONFIGURATION
@@ -107,6 +111,25 @@ class Config:
     CACHE_QUERY_ANALYSIS = os.getenv('CACHE_QUERY_ANALYSIS', 'true').lower() == 'true'
     ANALYSIS_CACHE_TTL = int(os.getenv('ANALYSIS_CACHE_TTL', '1800'))  # 30 minutes
     
+    # Response cache (exact + semantic match on the user question)
+    ENABLE_RESPONSE_CACHE = os.getenv('ENABLE_RESPONSE_CACHE', 'true').lower() == 'true'
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '3600'))  # 1 hour
+    RESPONSE_CACHE_MAXSIZE = int(os.getenv('RESPONSE_CACHE_MAXSIZE', '1024'))
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+    # Near matches down to this similarity are served only after an LLM equivalence check
+    SEMANTIC_CACHE_VERIFY_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_VERIFY_THRESHOLD', '0.85'))
+    OPENAI_EMBEDDING_MODEL = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-3-small')
+    # Also keep cached responses in the session database (survives restarts, shared by workers)
+    PERSIST_RESPONSE_CACHE = os.getenv('PERSIST_RESPONSE_CACHE', 'true').lower() == 'true'
+    # Few-shot SQL examples: similar earlier questions on the same database (0 disables)
+    FEW_SHOT_EXAMPLES = int(os.getenv('FEW_SHOT_EXAMPLES', '3'))
+    FEW_SHOT_MIN_SIMILARITY = float(os.getenv('FEW_SHOT_MIN_SIMILARITY', '0.6'))
+    
+    # Relevance gate: questions with no flight-data vocabulary are embedded and
+    # compared to prototype flight-data questions before any LLM call
+    ENABLE_RELEVANCE_GATE = os.getenv('ENABLE_RELEVANCE_GATE', 'true').lower() == 'true'
+    RELEVANCE_THRESHOLD = float(os.getenv('RELEVANCE_THRESHOLD', '0.25'))
+    
     # ========================================================================
     # SQL AGENT CONFIGURATION
     # ========================================================================
@@ -116,6 +139,12 @@ class Config:
     DEFAULT_QUERY_LIMIT = int(os.getenv('DEFAULT_QUERY_LIMIT', '1000'))
     MAX_QUERY_ROWS = int(os.getenv('MAX_QUERY_ROWS', '10000'))
     MAX_SAMPLE_ROWS = int(os.getenv('MAX_SAMPLE_ROWS', '50'))
+    # Results up to this many rows are answered from the template returned with the SQL (0 disables)
+    TEMPLATED_ANSWER_MAX_ROWS = int(os.getenv('TEMPLATED_ANSWER_MAX_ROWS', '20'))
+    # Wall-clock ceiling (seconds) for the whole generate/execute/retry workflow
+    AGENT_MAX_EXECUTION_TIME = float(os.getenv('AGENT_MAX_EXECUTION_TIME', '90'))
+    # Ceiling (seconds) a request thread waits for one question on the agent event loop
+    AGENT_REQUEST_TIMEOUT = float(os.getenv('AGENT_REQUEST_TIMEOUT', '180'))
     
     # PostgreSQL Configuration (if using PostgreSQL)
     DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -25,6 +25,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
+from modules.database import close_session_pool
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -257,6 +259,9 @@ class PostgreSQLCleanupService:
             exists = cursor.fetchone()
 
             if exists:
+                # Release pooled connections held by this process
+                close_session_pool(db_name)
+
                 # Terminate existing connections
                 cursor.execute("""
                     SELECT pg_terminate_backend(pg_stat_activity.pid)
@@ -2,19 +2,241 @@
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 from psycopg2 import sql
 import pandas as pd
 import os
+import json
 import logging
-from typing import Dict, List, Tuple, Any, Optional
+import re
+from typing import Dict, Iterator, List, Tuple, Any, Optional
 from datetime import datetime
 import sys
 import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from dotenv import load_dotenv
+
+from modules.response_cache import response_cache
 load_dotenv()
 
+# Optional: orjson serializes large result sets in C (falls back to json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+
+def dumps_json(obj: Any) -> str:
+    """Serialize query results to JSON, stringifying anything JSON can't represent (Decimal, dates)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, default=str)
+
+# ============================================================================
+# PROCESS-WIDE CONNECTION POOLS (ONE PER SESSION DATABASE)
+# ============================================================================
+
+# A manager is created for every request, so connections are checked out of a
+# per-database pool instead of being opened (and the database existence check
+# re-run) each time.
+POSTGRES_POOL_SIZE = int(os.getenv('POSTGRES_POOL_SIZE', '8'))
+# How long a new manager waits for a pooled connection before opening a direct one
+POSTGRES_POOL_WAIT = float(os.getenv('POSTGRES_POOL_WAIT', '2'))
+# Pooled connections idle longer than this (seconds) are pinged before reuse
+POSTGRES_PING_AFTER = float(os.getenv('POSTGRES_PING_AFTER', '1'))
+
+# Per-connection settings for the agent's small analytical queries, sent as
+# libpq startup options so they cost no extra round-trip:
+# - jit=off: JIT compilation adds ~100ms+ to aggregations over a few thousand rows
+# - work_mem: lets GROUP BY / ORDER BY over a session table sort in memory
+POSTGRES_SESSION_OPTIONS = os.getenv(
+    'POSTGRES_SESSION_OPTIONS',
+    '-c jit=off -c work_mem=64MB'
+)
+# Bounds runaway LLM-generated queries (ms, 0 disables). Set per transaction
+# with SET LOCAL on read paths only, so ingestion (COPY, CREATE INDEX,
+# ANALYZE, CREATE TABLE AS) on the same pooled connections is never cancelled.
+POSTGRES_STATEMENT_TIMEOUT_MS = int(os.getenv('POSTGRES_STATEMENT_TIMEOUT_MS', '60000'))
+# Statements execute_query treats as reads (timeout applied, transaction rolled back)
+_READ_STATEMENT_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+# Persisted agent responses keep at most this many table_rows (the full result
+# can be up to MAX_QUERY_ROWS, and every entry is reloaded when a worker warms)
+PERSISTED_RESPONSE_MAX_ROWS = int(os.getenv('PERSISTED_RESPONSE_MAX_ROWS', '1000'))
+# Session databases whose agent_cache.responses table is known to exist
+_CACHE_TABLE_READY = set()
+
+# Column metadata for public base tables, read from pg_catalog directly:
+# the information_schema views are slow to plan once a database has many
+# relations. Rows match information_schema.columns (table, column, data type,
+# 'YES'/'NO' nullable, default, character maximum length); format_type()
+# without a typmod gives the same type names. Stored generated columns
+# report no default, as in information_schema.
+_CATALOG_COLUMNS_SQL = """
+    SELECT
+        c.relname,
+        a.attname,
+        format_type(a.atttypid, NULL),
+        CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END,
+        CASE WHEN a.attgenerated = '' THEN pg_get_expr(d.adbin, d.adrelid) END,
+        CASE WHEN a.atttypid IN ('bpchar'::regtype, 'varchar'::regtype) AND a.atttypmod > 0
+             THEN a.atttypmod - 4 END
+    FROM pg_class c
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+    WHERE c.relnamespace = 'public'::regnamespace
+    AND c.relkind IN ('r', 'p')
+"""
+
+class _SessionPool(psycopg2.pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool that keeps returned connections and lets checkouts wait
+
+    psycopg2 only keeps a returned connection while fewer than minconn are
+    idle and closes the rest, but it also opens minconn connections up front.
+    One is opened eagerly; afterwards minconn is raised to maxconn so that
+    returned connections stay in the pool.
+
+    getconn_waiting() blocks on a condition signalled by putconn() instead
+    of polling, and the pool remembers when each connection was returned so
+    recently used ones skip the liveness ping.
+    """
+
+    def __init__(self, maxconn: int, *args, **kwargs):
+        self._returned = threading.Condition()
+        self._returns = 0
+        self._returned_at: Dict[int, float] = {}
+        super().__init__(1, maxconn, *args, **kwargs)
+        self.minconn = maxconn
+
+    def getconn_waiting(self, wait: float):
+        """Check out a connection, waiting up to `wait` seconds for one to be returned
+
+        Short request bursts then reuse the pool instead of each opening (and
+        tearing down) its own server connection. Raises PoolError on timeout.
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            with self._returned:
+                returns = self._returns
+            try:
+                return self.getconn()
+            except psycopg2.pool.PoolError:
+                with self._returned:
+                    remaining = deadline - time.monotonic()
+                    if self.closed or remaining <= 0:
+                        raise
+                    # A return between the failed getconn and here bumped the counter
+                    if self._returns == returns:
+                        self._returned.wait(remaining)
+
+    def available(self) -> int:
+        """Connections that can be checked out without waiting (idle or not yet opened)"""
+        with self._lock:
+            return 0 if self.closed else self.maxconn - len(self._used)
+
+    def idle_for(self, conn) -> float:
+        """Seconds since the connection was returned (0 for one never returned)"""
+        with self._returned:
+            returned_at = self._returned_at.get(id(conn))
+        return time.monotonic() - returned_at if returned_at is not None else 0.0
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        with self._returned:
+            if close or conn.closed:
+                self._returned_at.pop(id(conn), None)
+            else:
+                self._returned_at[id(conn)] = time.monotonic()
+            self._returns += 1
+            self._returned.notify()
+
+    def closeall(self):
+        super().closeall()
+        with self._returned:
+            self._returned_at.clear()
+            self._returned.notify_all()
+
+
+_SESSION_POOLS: Dict[str, _SessionPool] = {}
+_SESSION_POOLS_LOCK = threading.Lock()
+
+
+def _get_session_pool(db_name: str, pg_config: Dict[str, Any]) -> _SessionPool:
+    """Get (or lazily create) the connection pool for a session database"""
+    with _SESSION_POOLS_LOCK:
+        pool = _SESSION_POOLS.get(db_name)
+        if pool is None:
+            pool = _SessionPool(
+                POSTGRES_POOL_SIZE,
+                host=pg_config['host'],
+                port=pg_config['port'],
+                database=db_name,
+                user=pg_config['user'],
+                password=pg_config['password'],
+                options=POSTGRES_SESSION_OPTIONS
+            )
+            _SESSION_POOLS[db_name] = pool
+        return pool
+
+
+def _ping(conn) -> bool:
+    """Whether a pooled connection still reaches its backend
+
+    conn.closed stays 0 when the server terminates the backend (e.g. the
+    cleanup service), so only a round-trip tells. Runs in autocommit mode so
+    the check is a single statement with no transaction left open.
+    """
+    if conn.closed:
+        return False
+    try:
+        conn.rollback()
+        autocommit = conn.autocommit
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        finally:
+            conn.autocommit = autocommit
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout(pool: _SessionPool, wait: float):
+    """Check out a live pooled connection, discarding dead ones (raises PoolError when none is free)"""
+    for _ in range(pool.maxconn + 1):
+        conn = pool.getconn_waiting(wait)
+        if pool.idle_for(conn) < POSTGRES_PING_AFTER or _ping(conn):
+            return conn
+        pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError(f"No live connection available in pool (max {pool.maxconn})")
+
+
+def _limit_statement_time(conn):
+    """Apply POSTGRES_STATEMENT_TIMEOUT_MS to the connection's current transaction"""
+    if POSTGRES_STATEMENT_TIMEOUT_MS > 0:
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout = %s", (POSTGRES_STATEMENT_TIMEOUT_MS,))
+
+
+def close_session_pool(db_name: str):
+    """Close all pooled connections for a session database (call before dropping it)"""
+    with _SESSION_POOLS_LOCK:
+        pool = _SESSION_POOLS.pop(db_name, None)
+        _CACHE_TABLE_READY.discard(db_name)
+    if pool is not None:
+        pool.closeall()
+        logger.info(f"Closed connection pool for {db_name}")
+
+
 class PostgreSQLManager:
     """Manages PostgreSQL connections and operations for flight data (Local Ubuntu Server)"""
     
@@ -38,15 +260,29 @@ class PostgreSQLManager:
         
         # Create database name based on session_id (PostgreSQL database names must be lowercase)
         self.db_name = f"session_{session_id.lower().replace('-', '_')}"
-        self.conn = None
+        # Writable connection, checked out on first use of self.conn; read
+        # paths take their own read-only connection per use, so a request
+        # that only reads holds a single connection at a time
+        self._conn = None
+        self._conn_pooled = False
         
-        # Create the session database if it doesn't exist
+        # Create the session database if it doesn't exist. Checked on every
+        # manager even when this process already has a pool: another worker's
+        # session cleanup may have dropped the database since. Dead pooled
+        # connections are then discarded by the checkout ping.
         self._create_database_if_not_exists()
-        self._connect()
+        self._pool = _get_session_pool(self.db_name, self.pg_config)
         
         # Create marker file for session tracking
         self._create_session_marker()
     
+    @property
+    def conn(self):
+        """Writable connection to the session database (checked out on first use)"""
+        if self._conn is None:
+            self._connect()
+        return self._conn
+    
     def _create_session_marker(self):
         """Create a marker file to track the session for compatibility"""
         try:
@@ -124,16 +360,15 @@ class PostgreSQLManager:
             print(f"🔌 [DEBUG] PostgreSQL Manager → Connecting to session database: {self.db_name}", flush=True)
             print(f"🗄️ [DEBUG] PostgreSQL Manager → Database name: {self.db_name}", flush=True)
             
-            self.conn = psycopg2.connect(
-                host=self.pg_config['host'],
-                port=self.pg_config['port'],
-                database=self.db_name,
-                user=self.pg_config['user'],
-                password=self.pg_config['password']
-            )
+            try:
+                self._conn, self._conn_pooled = _checkout(self._pool, POSTGRES_POOL_WAIT), True
+            except psycopg2.pool.PoolError:
+                # Pool exhausted - fall back to a dedicated connection
+                logger.warning(f"Connection pool exhausted for {self.db_name}, opening a direct connection")
+                self._conn, self._conn_pooled = self._connect_direct(), False
             
             # Set autocommit to False for transaction control
-            self.conn.autocommit = False
+            self._conn.autocommit = False
             
             print(f"✅ [DEBUG] PostgreSQL Manager → Successfully connected to session database for: {self.session_id}", flush=True)
             logger.info(f"Connected to PostgreSQL session database for {self.session_id}")
@@ -142,30 +377,28 @@ class PostgreSQLManager:
             logger.error(f"Failed to connect to PostgreSQL: {e}")
             raise
     
+    def _connect_direct(self):
+        """Open an unpooled connection to the session database"""
+        return psycopg2.connect(
+            host=self.pg_config['host'],
+            port=self.pg_config['port'],
+            database=self.db_name,
+            user=self.pg_config['user'],
+            password=self.pg_config['password'],
+            options=POSTGRES_SESSION_OPTIONS
+        )
+    
     def _check_tables_exist(self) -> bool:
         """Check if required tables exist in the database"""
         try:
             cursor = self.conn.cursor()
             
-            # Check if clean_flights table exists
+            # Both tables in one catalog lookup (to_regclass is NULL for a missing table)
             cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_name = 'clean_flights'
-                )
-            """)
-            clean_exists = cursor.fetchone()[0]
-            
-            # Check if error_flights table exists
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_name = 'error_flights'
-                )
+                SELECT to_regclass('public.clean_flights') IS NOT NULL,
+                       to_regclass('public.error_flights') IS NOT NULL
             """)
-            error_exists = cursor.fetchone()[0]
+            clean_exists, error_exists = cursor.fetchone()
             
             cursor.close()
             
@@ -196,6 +429,7 @@ class PostgreSQLManager:
                 try:
                     cursor.execute("DROP TABLE IF EXISTS clean_flights CASCADE")
                     cursor.execute("DROP TABLE IF EXISTS error_flights CASCADE")
+                    cursor.execute("DROP TABLE IF EXISTS fuel_by_registration")
                     self.conn.commit()
                     print(f"🗑️ [DEBUG] PostgreSQL Manager → Dropped existing tables", flush=True)
                 except Exception as e:
@@ -230,6 +464,16 @@ class PostgreSQLManager:
                 print(f"🔍 [DEBUG] PostgreSQL Manager → Creating database indexes", flush=True)
                 self._create_indexes()
                 print(f"✅ [DEBUG] PostgreSQL Manager → Database indexes created", flush=True)
+                
+                # Pre-aggregate the hottest per-aircraft fuel rollup once at ingestion
+                self._create_summary_tables()
+                
+                # Statistics last, so they cover the indexes and the rollup
+                self._analyze_tables()
+                
+                # Answers cached for the previous upload no longer hold
+                response_cache.clear(self.db_name)
+                self.clear_cached_responses()
             else:
                 print(f"✅ [DEBUG] PostgreSQL Manager → Tables already exist, skipping data loading", flush=True)
             
@@ -331,6 +575,7 @@ class PostgreSQLManager:
             ('idx_clean_flights_flight_no', 'clean_flights', '"Flight No"'),  # Fixed: was "Flight", now "Flight No"
             ('idx_clean_flights_origin', 'clean_flights', '"Origin ICAO"'),
             ('idx_clean_flights_destination', 'clean_flights', '"Destination ICAO"'),
+            ('idx_clean_flights_ac_type', 'clean_flights', '"A/C Type"'),
             # For error_flights
             ('idx_error_flights_category', 'error_flights', '"Error_Category"'),
             ('idx_error_flights_row_index', 'error_flights', '"Row_Index"'),
@@ -352,37 +597,77 @@ class PostgreSQLManager:
         
         cursor.close()
     
+    def _analyze_tables(self):
+        """Collect planner statistics once every session table, index and rollup exists"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT to_regclass('fuel_by_registration')")
+            tables = ['clean_flights', 'error_flights']
+            if cursor.fetchone()[0] is not None:
+                tables.append('fuel_by_registration')
+            for table_name in tables:
+                cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table_name)))
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning(f"Could not analyze session tables: {e}")
+        finally:
+            cursor.close()
+    
+    def _create_summary_tables(self):
+        """Materialize small pre-aggregated tables for frequently asked questions
+
+        Per-aircraft fuel questions otherwise recompute "Block off Fuel" -
+        "Block on Fuel" over every clean_flights row on each query. The session
+        data is static after ingestion, so a plain table (listed in the schema
+        prompt like any other) is enough.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("DROP TABLE IF EXISTS fuel_by_registration")
+            cursor.execute("""
+                CREATE TABLE fuel_by_registration AS
+                SELECT
+                    "A/C Registration",
+                    "A/C Type",
+                    COUNT(*) AS flight_count,
+                    SUM("Block off Fuel" - "Block on Fuel") AS total_fuel_consumed,
+                    AVG("Block off Fuel" - "Block on Fuel") AS avg_fuel_consumed
+                FROM clean_flights
+                WHERE "Block off Fuel" IS NOT NULL AND "Block on Fuel" IS NOT NULL
+                GROUP BY "A/C Registration", "A/C Type"
+            """)
+            self.conn.commit()
+            logger.info("Created summary table fuel_by_registration")
+        except Exception as e:
+            # Columns missing or non-numeric in this upload - queries fall back to clean_flights
+            self.conn.rollback()
+            logger.warning(f"Could not create summary table fuel_by_registration: {e}")
+        finally:
+            cursor.close()
+    
+    @staticmethod
+    def _format_column(row: Tuple) -> Dict[str, Any]:
+        """Shape a column metadata row (name, type, 'YES'/'NO' nullable, default, max length)"""
+        return {
+            'column_name': row[0],
+            'data_type': row[1],
+            'nullable': row[2] == 'YES',
+            'default': row[3],
+            'extra': row[4]  # character_maximum_length as extra
+        }
+    
     def _get_table_schema(self, table_name: str) -> List[Dict[str, str]]:
         """Get schema information for a table"""
         try:
             cursor = self.conn.cursor()
             
-            cursor.execute("""
-                SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default,
-                    character_maximum_length
-                FROM information_schema.columns
-                WHERE table_schema = 'public' 
-                AND table_name = %s
-                ORDER BY ordinal_position
-            """, (table_name,))
+            cursor.execute(_CATALOG_COLUMNS_SQL + " AND c.relname = %s ORDER BY a.attnum", (table_name,))
             
             result = cursor.fetchall()
             cursor.close()
             
-            return [
-                {
-                    'column_name': row[0],
-                    'data_type': row[1],
-                    'nullable': row[2] == 'YES',
-                    'default': row[3],
-                    'extra': row[4]  # character_maximum_length as extra
-                }
-                for row in result
-            ]
+            return [self._format_column(row[1:]) for row in result]
         except Exception as e:
             logger.error(f"Failed to get schema for {table_name}: {e}")
             return []
@@ -395,6 +680,9 @@ class PostgreSQLManager:
 
             print(f"🔍 [DEBUG] PostgreSQL Manager → Executing SQL: {sql[:200]}...", flush=True)
 
+            is_read = _READ_STATEMENT_RE.match(sql) is not None
+            if is_read:
+                _limit_statement_time(self.conn)
             cursor = self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
             
             if params:
@@ -402,21 +690,18 @@ class PostgreSQLManager:
             else:
                 cursor.execute(sql)
             
-            # Get column names from cursor description
             if cursor.description:
-                columns = [desc[0] for desc in cursor.description]
-                
-                # Fetch results
-                result = cursor.fetchall()
-                
-                # Convert RealDictCursor results to list of dicts
-                data = [dict(row) for row in result]
+                # RealDictCursor rows are already dicts - no per-row copy needed
+                data = cursor.fetchall()
             else:
                 # For non-SELECT queries
                 data = []
             
-            # Commit for non-SELECT queries
-            if not sql.strip().upper().startswith('SELECT'):
+            # Commit writes; end reads too so the SET LOCAL timeout does not
+            # outlive this query
+            if is_read:
+                self.conn.rollback()
+            else:
                 self.conn.commit()
             
             cursor.close()
@@ -430,6 +715,105 @@ class PostgreSQLManager:
             logger.error(f"Query execution failed: {e}")
             return [], str(e)
     
+    def _checkout_read_conn(self) -> Tuple[Any, bool]:
+        """Get a connection in a read-only session: (connection, whether it is pooled)
+
+        Waits up to POSTGRES_POOL_WAIT for a pooled connection, then opens a
+        temporary direct one. Never hands out self.conn, which is writable:
+        read paths run LLM-generated SQL. Raises if no connection can be made.
+        """
+        conn, pooled = None, False
+        try:
+            conn, pooled = _checkout(self._pool, POSTGRES_POOL_WAIT), True
+        except psycopg2.Error as e:
+            logger.warning(f"No pooled read connection for {self.db_name} ({e}), opening a direct one")
+        if conn is None:
+            conn = self._connect_direct()
+        try:
+            conn.set_session(readonly=True, autocommit=False)
+        except psycopg2.Error:
+            self._release_read_conn(conn, pooled)
+            raise
+        return conn, pooled
+
+    def _release_read_conn(self, conn, pooled: bool):
+        """Reset a read-only connection and hand it back to the pool (or close a direct one)"""
+        if not pooled:
+            conn.close()
+            return
+        broken = False
+        try:
+            conn.rollback()
+            conn.set_session(readonly=False)
+        except psycopg2.Error:
+            broken = True
+        try:
+            self._pool.putconn(conn, close=broken or bool(conn.closed))
+        except psycopg2.pool.PoolError:
+            conn.close()
+
+    def free_connections(self) -> int:
+        """How many pooled connections this session database has free right now"""
+        return self._pool.available()
+
+    @contextmanager
+    def read_connection(self):
+        """Get a pooled connection in a read-only session for read paths
+
+        Read paths (streamed SELECTs, schema fingerprints, samples) use it so
+        they do not queue behind self.conn and cannot write, even if the SQL
+        came from the LLM. The connection goes back to the pool as soon as the
+        block exits. When the pool has no connection free, a temporary direct
+        read-only connection is opened - never self.conn. Each use runs in its
+        own transaction bounded by POSTGRES_STATEMENT_TIMEOUT_MS.
+        """
+        conn, pooled = self._checkout_read_conn()
+        try:
+            _limit_statement_time(conn)
+            yield conn
+        finally:
+            self._release_read_conn(conn, pooled)
+
+    def iter_query(self, sql: str, batch_size: int = 2048, server_side: bool = True) -> Iterator[List[Dict]]:
+        """Stream a SELECT in batches of rows through a server-side (named) cursor
+
+        Rows are pulled from PostgreSQL batch_size at a time instead of being
+        materialized client-side all at once, so callers can stop early.
+        Runs on a read-only connection; errors are raised to the caller.
+        Rows come back as plain tuples and are zipped with the column names
+        once per batch, which is much cheaper than RealDictCursor building
+        each row dict column by column in Python.
+
+        With server_side=False a plain cursor fetches the whole result in one
+        round-trip (no DECLARE/FETCH/CLOSE) - cheaper when a LIMIT already
+        keeps the result small.
+        """
+        self.update_last_accessed()
+        print(f"🔍 [DEBUG] PostgreSQL Manager → Streaming SQL: {sql[:200]}...", flush=True)
+
+        with self.read_connection() as conn:
+            if server_side:
+                cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+                cursor.itersize = batch_size
+            else:
+                cursor = conn.cursor()
+            try:
+                cursor.execute(sql)
+                columns = None
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    if columns is None:
+                        # Named cursors only have a description after the first fetch
+                        columns = [col[0] for col in cursor.description]
+                    yield [dict(zip(columns, row)) for row in batch]
+            finally:
+                # Also runs when the caller stops early (generator close);
+                # read_connection() then ends the cursor's transaction
+                if not cursor.closed:
+                    cursor.close()
+
     def validate_sql(self, sql: str) -> Tuple[bool, Optional[str]]:
         """Validate SQL query without executing it"""
         try:
@@ -443,40 +827,185 @@ class PostgreSQLManager:
             return False, str(e)
     
     def get_table_info(self) -> Dict[str, Any]:
-        """Get information about all tables in the database"""
+        """Get information about all tables in the database (two round-trips for any number of tables)"""
         try:
-            cursor = self.conn.cursor()
-            
-            # Get all tables
-            cursor.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_type = 'BASE TABLE'
-            """)
-            tables = cursor.fetchall()
-            
-            table_info = {}
-            
-            for table in tables:
-                table_name = table[0]
-                schema = self._get_table_schema(table_name)
+            with self.read_connection() as conn:
+                cursor = conn.cursor()
                 
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                row_count = cursor.fetchone()[0]
+                # Columns of every base table in one catalog query, bucketed per table
+                cursor.execute(_CATALOG_COLUMNS_SQL + " ORDER BY c.relname, a.attnum")
                 
-                table_info[table_name] = {
-                    'schema': schema,
-                    'row_count': row_count
-                }
-            
-            cursor.close()
+                table_info = {}
+                for row in cursor.fetchall():
+                    info = table_info.setdefault(row[0], {'schema': [], 'row_count': 0})
+                    info['schema'].append(self._format_column(row[1:]))
+                
+                # Exact row counts for all tables in a single UNION ALL statement
+                if table_info:
+                    count_query = sql.SQL(" UNION ALL ").join(
+                        sql.SQL("SELECT {name}, COUNT(*) FROM {table}").format(
+                            name=sql.Literal(table_name),
+                            table=sql.Identifier(table_name)
+                        )
+                        for table_name in table_info
+                    )
+                    cursor.execute(count_query)
+                    for table_name, row_count in cursor.fetchall():
+                        table_info[table_name]['row_count'] = row_count
+                
+                cursor.close()
             return table_info
             
         except Exception as e:
             logger.error(f"Failed to get table info: {e}")
             return {}
     
+    def get_table_samples(self, table_names: List[str], limit: int = 3) -> Dict[str, List[Dict]]:
+        """Get the first few rows of several tables in one UNION ALL round-trip
+
+        Rows are serialized with row_to_json, so tables with different columns
+        can share the statement.
+        """
+        if not table_names:
+            return {}
+        try:
+            sample_query = sql.SQL(" UNION ALL ").join(
+                sql.SQL("(SELECT {name}, row_to_json(s) FROM (SELECT * FROM {table} LIMIT {limit}) s)").format(
+                    name=sql.Literal(table_name),
+                    table=sql.Identifier(table_name),
+                    limit=sql.Literal(limit)
+                )
+                for table_name in table_names
+            )
+            samples = {table_name: [] for table_name in table_names}
+            with self.read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sample_query)
+                for table_name, row in cursor.fetchall():
+                    samples[table_name].append(row)
+                cursor.close()
+            return samples
+        except Exception as e:
+            logger.warning(f"Could not get sample data: {e}")
+            return {}
+    
+    def get_schema_fingerprint(self) -> Optional[str]:
+        """Get a hash of the public schema's tables, columns and types (one cheap query)
+
+        The hash is computed server-side, so a single value comes back instead
+        of one row per column.
+        """
+        try:
+            with self.read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT md5(coalesce(string_agg(
+                        c.relname || '.' || a.attname || ':' || format_type(a.atttypid, NULL), ','
+                        ORDER BY c.relname, a.attnum
+                    ), ''))
+                    FROM pg_class c
+                    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+                    WHERE c.relnamespace = 'public'::regnamespace
+                    AND c.relkind IN ('r', 'p')
+                """)
+                fingerprint = cursor.fetchone()[0]
+                cursor.close()
+            return fingerprint
+        except Exception as e:
+            logger.error(f"Failed to get schema fingerprint: {e}")
+            return None
+    
+    def load_cached_responses(self, max_age_seconds: int) -> List[Tuple[str, Optional[List[float]], Dict[str, Any], float]]:
+        """Load persisted agent responses younger than max_age_seconds
+
+        Returns (question, embedding, response, created_at epoch) tuples, oldest
+        first. Expired rows are deleted on the way. The cache lives in its own
+        schema so it never shows up in the public-schema prompt.
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT to_regclass('agent_cache.responses')")
+            if cursor.fetchone()[0] is None:
+                cursor.close()
+                self.conn.rollback()
+                return []
+            cursor.execute(
+                "DELETE FROM agent_cache.responses WHERE created_at < now() - %s * interval '1 second'",
+                (max_age_seconds,)
+            )
+            cursor.execute("""
+                SELECT question, embedding, response, EXTRACT(EPOCH FROM created_at)
+                FROM agent_cache.responses
+                ORDER BY created_at
+            """)
+            rows = cursor.fetchall()
+            self.conn.commit()
+            cursor.close()
+            return [(question, embedding, response, float(created_at))
+                    for question, embedding, response, created_at in rows]
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning(f"Failed to load persisted response cache: {e}")
+            return []
+    
+    def save_cached_response(self, question_key: str, question: str, embedding: Optional[List[float]],
+                             response: Dict[str, Any]):
+        """Persist an agent response, upserted on the (normalized) question key
+
+        table_rows beyond PERSISTED_RESPONSE_MAX_ROWS are dropped (flagged in
+        the metadata). The cache table is created once per session database.
+        """
+        rows = response.get("table_rows")
+        if isinstance(rows, list) and len(rows) > PERSISTED_RESPONSE_MAX_ROWS:
+            response = {**response, "table_rows": rows[:PERSISTED_RESPONSE_MAX_ROWS]}
+            response["metadata"] = {**response.get("metadata", {}), "table_rows_truncated": True}
+        try:
+            cursor = self.conn.cursor()
+            if self.db_name not in _CACHE_TABLE_READY:
+                cursor.execute("CREATE SCHEMA IF NOT EXISTS agent_cache")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS agent_cache.responses (
+                        question_key TEXT PRIMARY KEY,
+                        question TEXT NOT NULL,
+                        embedding REAL[],
+                        response JSONB NOT NULL,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                """)
+            cursor.execute("""
+                INSERT INTO agent_cache.responses (question_key, question, embedding, response)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (question_key) DO UPDATE
+                SET question = EXCLUDED.question, embedding = EXCLUDED.embedding,
+                    response = EXCLUDED.response, created_at = now()
+            """, (
+                question_key,
+                question,
+                embedding,
+                dumps_json(response)
+            ))
+            self.conn.commit()
+            cursor.close()
+            _CACHE_TABLE_READY.add(self.db_name)
+        except Exception as e:
+            self.conn.rollback()
+            # Recreate the table next time in case it was dropped
+            _CACHE_TABLE_READY.discard(self.db_name)
+            logger.warning(f"Failed to persist response cache entry: {e}")
+    
+    def clear_cached_responses(self):
+        """Delete all persisted agent responses (answers are stale after a schema change)"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT to_regclass('agent_cache.responses')")
+            if cursor.fetchone()[0] is not None:
+                cursor.execute("DELETE FROM agent_cache.responses")
+            self.conn.commit()
+            cursor.close()
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning(f"Failed to clear persisted response cache: {e}")
+    
     def get_connection_string(self) -> str:
         """Get SQLAlchemy connection string for PostgreSQL"""
         return (
@@ -486,9 +1015,27 @@ class PostgreSQLManager:
         )
     
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
+        """Return the connection to the session pool (or close it if unpooled)"""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        
+        if self._conn_pooled:
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    # Hand the connection back without an open transaction
+                    conn.rollback()
+                except Exception:
+                    broken = True
+            try:
+                self._pool.putconn(conn, close=broken)
+            except psycopg2.pool.PoolError:
+                # Pool was closed (session dropped) while we held the connection
+                conn.close()
+            logger.info(f"Returned PostgreSQL connection to pool for session {self.session_id}")
+        else:
+            conn.close()
             logger.info(f"Closed PostgreSQL connection for session {self.session_id}")
     
     def cleanup_old_sessions(self, max_age_hours: int = 24):
@@ -528,6 +1075,7 @@ class PostgreSQLManager:
                         
                         # Drop database if exists
                         try:
+                            close_session_pool(db_name)
                             cursor.execute(
                                 sql.SQL("DROP DATABASE IF EXISTS {}").format(
                                     sql.Identifier(db_name)
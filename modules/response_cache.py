@@ -0,0 +1,323 @@
+# response_cache.py
+
+"""
+Two-tier response cache for the flight data SQL agent
+
+Repeated questions ("top 10 aircraft by fuel consumption") would otherwise pay
+the full GPT-4.1 analysis + SQL generation + answer generation round-trips.
+
+TIERS:
+1. Exact match on the normalized question (lowercased, whitespace collapsed)
+2. Semantic match on the question embedding (cosine similarity >= threshold).
+   Near matches (verify_threshold <= similarity < threshold) are only served
+   when a caller-supplied verifier confirms the two questions are equivalent.
+   Questions that differ only in a parameter ("top 5" / "top 10", two ICAO
+   codes) embed almost identically, so in both tiers an entry is only a
+   candidate when it has the same numbers and upper-case codes.
+
+Entries are namespaced by session database, since the same question has a
+different answer for every uploaded dataset. Both tiers expire after
+Config.RESPONSE_CACHE_TTL seconds. The agent can also persist entries in the
+session database and warm() a namespace from them after a restart. Near
+but non-matching entries double as few-shot SQL examples
+(similar_sql_examples).
+"""
+
+import asyncio
+import copy
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from cachetools import TTLCache
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for exact-match lookups"""
+    return " ".join(question.lower().split())
+
+
+# Spelled-out numbers are compared as digits ("top ten" == "top 10")
+_NUMBER_WORDS = {
+    word: str(value) for value, word in enumerate((
+        "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+        "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen",
+        "eighteen", "nineteen", "twenty"
+    ))
+}
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?|\b(?:%s)\b" % "|".join(_NUMBER_WORDS), re.IGNORECASE)
+# ICAO/IATA codes, registrations (N12345, G-ABCD) and flight numbers (AA100)
+_CODE_RE = re.compile(r"\b[A-Z][A-Z0-9]*(?:-[A-Z0-9]+)+\b|\b[A-Z][A-Z0-9]+\b")
+
+
+def question_parameters(question: str) -> Tuple[List[str], List[str]]:
+    """Numeric literals and upper-case codes in a question (sorted), for semantic hit checks"""
+    numbers = sorted(_NUMBER_WORDS.get(number.lower(), number) for number in _NUMBER_RE.findall(question))
+    codes = sorted(_CODE_RE.findall(question))
+    return numbers, codes
+
+
+class ResponseCache:
+    """Exact + semantic cache of successful agent responses"""
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 3600, threshold: float = 0.95,
+                 verify_threshold: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.verify_threshold = min(verify_threshold, threshold) if verify_threshold else threshold
+
+        self._lock = threading.Lock()
+        self._exact_cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        # Per-namespace semantic store: stacked unit-norm float32 embeddings
+        # plus the matching (created_at, question, response) entries, oldest first
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._entries: Dict[str, List[Tuple[float, str, Dict[str, Any]]]] = {}
+
+        self._embeddings = None
+
+        # Namespaces already loaded from persistent storage in this process
+        self._warmed: set = set()
+
+    # ========================================================================
+    # EMBEDDINGS
+    # ========================================================================
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        """Embed a question as a unit-norm float32 vector (None if unavailable)"""
+        try:
+            if self._embeddings is None:
+                from langchain_openai import OpenAIEmbeddings
+                self._embeddings = OpenAIEmbeddings(
+                    api_key=Config.OPENAI_API_KEY,
+                    model=Config.OPENAI_EMBEDDING_MODEL
+                )
+            vector = np.asarray(self._embeddings.embed_query(question), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            return vector / norm if norm else None
+        except Exception as e:
+            logger.warning("Could not embed question for semantic cache: %s", e)
+            return None
+
+    async def aembed(self, question: str) -> Optional[np.ndarray]:
+        """Embed a question off the event loop so it can overlap other calls"""
+        return await asyncio.to_thread(self._embed, question)
+
+    # ========================================================================
+    # LOOKUP / STORE
+    # ========================================================================
+
+    def _key(self, namespace: str, question: str) -> str:
+        digest = hashlib.sha1(normalize_question(question).encode()).hexdigest()
+        return f"{namespace}:{digest}"
+
+    def _prune_expired(self, namespace: str, now: float):
+        """Drop expired semantic entries (caller holds the lock)"""
+        entries = self._entries.get(namespace, [])
+        keep_from = 0
+        while keep_from < len(entries) and now - entries[keep_from][0] > self.ttl:
+            keep_from += 1
+        if keep_from:
+            self._entries[namespace] = entries[keep_from:]
+            self._vectors[namespace] = self._vectors[namespace][keep_from:]
+
+    def lookup(self, namespace: str, question: str) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Look up a cached response
+
+        Returns:
+            Tuple of (response or None, question embedding or None). The
+            embedding is handed back so a later store() does not embed twice.
+        """
+        cached = self.lookup_exact(namespace, question)
+        if cached is not None:
+            return cached, None
+
+        embedding = self._embed(question)
+        return self.lookup_semantic(namespace, question, embedding), embedding
+
+    def lookup_exact(self, namespace: str, question: str) -> Optional[Dict[str, Any]]:
+        """Look up a response by normalized question only (no embedding call)"""
+        with self._lock:
+            cached = self._exact_cache.get(self._key(namespace, question))
+        if cached is None:
+            return None
+        logger.info("💾 Response cache hit (exact) for: %s", question)
+        return self._mark_hit(cached, "exact")
+
+    def lookup_semantic(self, namespace: str, question: str, embedding: Optional[np.ndarray],
+                        verify: Optional[Callable[[str, str], bool]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a response by an already computed question embedding
+
+        Only entries with the same numbers and upper-case codes as the
+        question are considered (nearest first). verify(cached_question,
+        question) is called (outside the lock) for a near match below the
+        direct-hit threshold; without it those miss.
+        """
+        if embedding is None:
+            return None
+        min_similarity = self.verify_threshold if verify is not None else self.threshold
+
+        with self._lock:
+            self._prune_expired(namespace, time.time())
+            vectors = self._vectors.get(namespace)
+            if vectors is None or not len(vectors):
+                return None
+            similarities = vectors @ embedding
+            entries = self._entries[namespace]
+            parameters = question_parameters(question)
+            for index in np.argsort(-similarities):
+                similarity = float(similarities[index])
+                if similarity < min_similarity:
+                    return None
+                _, cached_question, cached = entries[index]
+                if question_parameters(cached_question) == parameters:
+                    break
+            else:
+                return None
+
+        tier = "semantic"
+        if similarity < self.threshold:
+            if not verify(cached_question, question):
+                return None
+            tier = "semantic_verified"
+
+        logger.info("💾 Response cache hit (%s, similarity %.3f) for: %s", tier, similarity, question)
+        return self._mark_hit(cached, tier)
+
+    def similar_sql_examples(self, namespace: str, embedding: Optional[np.ndarray], k: int,
+                             min_similarity: float) -> List[Tuple[str, str]]:
+        """
+        Return up to k (question, sql_query) pairs from cached successful responses
+
+        Nearest first, at least min_similarity, one per distinct SQL. Used as
+        few-shot examples for SQL generation on the same session database.
+        """
+        if embedding is None or k <= 0:
+            return []
+        with self._lock:
+            self._prune_expired(namespace, time.time())
+            vectors = self._vectors.get(namespace)
+            if vectors is None or not len(vectors):
+                return []
+            similarities = vectors @ embedding
+            entries = self._entries[namespace]
+
+        examples: List[Tuple[str, str]] = []
+        seen = set()
+        for index in np.argsort(-similarities):
+            if similarities[index] < min_similarity or len(examples) >= k:
+                break
+            _, cached_question, cached = entries[index]
+            sql_query = (cached.get("metadata") or {}).get("sql_query")
+            if sql_query and sql_query not in seen:
+                seen.add(sql_query)
+                examples.append((cached_question, sql_query))
+        return examples
+
+    def store(self, namespace: str, question: str, response: Dict[str, Any],
+              embedding: Optional[np.ndarray] = None):
+        """Store a successful response under both tiers"""
+        if not response.get("success"):
+            return
+
+        entry = copy.deepcopy(response)
+        with self._lock:
+            self._exact_cache[self._key(namespace, question)] = entry
+
+            if embedding is None:
+                return
+            now = time.time()
+            self._prune_expired(namespace, now)
+            vectors = self._vectors.get(namespace)
+            if vectors is None:
+                vectors = np.empty((0, embedding.shape[0]), dtype=np.float32)
+            entries = self._entries.get(namespace, [])
+
+            vectors = np.vstack([vectors, embedding[np.newaxis, :]])
+            entries = entries + [(now, question, entry)]
+            if len(entries) > self.maxsize:
+                vectors = vectors[-self.maxsize:]
+                entries = entries[-self.maxsize:]
+            self._vectors[namespace] = vectors
+            self._entries[namespace] = entries
+
+    def claim_warmup(self, namespace: str) -> bool:
+        """Return True exactly once per namespace: the caller should then call warm()"""
+        with self._lock:
+            if namespace in self._warmed:
+                return False
+            self._warmed.add(namespace)
+            return True
+
+    def warm(self, namespace: str, entries: List[Tuple[str, Optional[List[float]], Dict[str, Any], float]]):
+        """Load persisted (question, embedding, response, created_at) entries
+
+        They are merged with what is already in memory, keeping the newest
+        entry per question, and re-sorted oldest first (_prune_expired and
+        the size bound rely on that order).
+        """
+        now = time.time()
+        with self._lock:
+            merged = {}
+            vectors = self._vectors.get(namespace)
+            for index, (created_at, question, response) in enumerate(self._entries.get(namespace, [])):
+                merged[normalize_question(question)] = (created_at, vectors[index], question, response)
+            for question, embedding, response, created_at in entries:
+                if now - created_at > self.ttl:
+                    continue
+                key = self._key(namespace, question)
+                if key not in self._exact_cache:
+                    self._exact_cache[key] = response
+                if not embedding:
+                    continue
+                vector = np.asarray(embedding, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                current = merged.get(normalize_question(question))
+                if norm and (current is None or current[0] < created_at):
+                    merged[normalize_question(question)] = (created_at, vector / norm, question, response)
+            if merged:
+                ordered = sorted(merged.values(), key=lambda item: item[0])[-self.maxsize:]
+                self._vectors[namespace] = np.vstack([item[1] for item in ordered])
+                self._entries[namespace] = [(item[0], item[2], item[3]) for item in ordered]
+        logger.info("💾 Warmed response cache for %s with %s persisted entries", namespace, len(entries))
+
+    def _mark_hit(self, cached: Dict[str, Any], tier: str) -> Dict[str, Any]:
+        """Return a copy of a cached response flagged as a cache hit"""
+        response = copy.deepcopy(cached)
+        metadata = response.setdefault("metadata", {})
+        metadata["cache_hit"] = True
+        metadata["cache_tier"] = tier
+        return response
+
+    def clear(self, namespace: Optional[str] = None):
+        """Clear all entries, or only those of one session database"""
+        with self._lock:
+            if namespace is None:
+                self._exact_cache.clear()
+                self._vectors.clear()
+                self._entries.clear()
+                return
+            for key in [k for k in self._exact_cache.keys() if k.startswith(f"{namespace}:")]:
+                self._exact_cache.pop(key, None)
+            self._vectors.pop(namespace, None)
+            self._entries.pop(namespace, None)
+
+
+# Process-wide cache shared by all agent instances (agents are built per request)
+response_cache = ResponseCache(
+    maxsize=Config.RESPONSE_CACHE_MAXSIZE,
+    ttl=Config.RESPONSE_CACHE_TTL,
+    threshold=Config.SEMANTIC_CACHE_THRESHOLD,
+    verify_threshold=Config.SEMANTIC_CACHE_VERIFY_THRESHOLD
+)
@@ -17,7 +17,7 @@ WORKFLOW:
 4. GPT-4o-mini provides comprehensive analysis of results
 
 Author: Flight Data Analysis System
-Dependencies: langchain, langchain-openai, langchain-community, psycopg2, openai, langgraph
+Dependencies: langchain, langchain-openai, psycopg2, langgraph
 
 REQUIRED CONFIG.PY ADDITIONS:
 ```python
@@ -36,34 +36,176 @@ class Config:
 """
 
 import os
+import re
+import asyncio
+import atexit
+import copy
 import json
 import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from decimal import Decimal
 from typing import Dict, List, Tuple, Optional, Any
 from typing_extensions import TypedDict
-from datetime import datetime
+import httpx
 import psycopg2
 import psycopg2.extras
-import openai
-from sqlalchemy import create_engine, inspect, text
-from sqlalchemy.engine import Engine
+from psycopg2 import sql
 
-# LangChain imports - REQUIRED
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits import create_sql_agent
+# LangChain imports - REQUIRED (only what the LangGraph workflow uses; the
+# langchain_community agent toolkits are slow to import and not needed here)
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from langchain.schema import BaseOutputParser
-from langchain.agents import AgentType
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel, Field
+from jinja2 import StrictUndefined, Template
+from jinja2.sandbox import SandboxedEnvironment
+import numpy as np
 
 from config import Config
-from modules.database import PostgreSQLManager
+from modules.database import POSTGRES_POOL_SIZE, PostgreSQLManager, dumps_json
+from modules.response_cache import normalize_question, response_cache
+
+# HTTP/2 needs the optional h2 package; plain keep-alive HTTP/1.1 otherwise
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# ============================================================================
+# SHARED LLM CLIENTS AND ENGINES
+# ============================================================================
+
+# Agents are built per chat request; share the LLM clients (HTTP connection
+# pools, tokenizer state) across instances instead of rebuilding them every
+# time. Database connections come from the manager's per-database pool.
+_LLM_CACHE: Dict[Tuple[str, float, int], ChatOpenAI] = {}
+_CACHE_LOCK = threading.Lock()
+
+# One keep-alive connection pool per process for every model/settings
+# combination, so OpenAI TLS connections are reused across agents and requests
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+_HTTP_CLIENT: Optional[httpx.Client] = None
+_HTTP_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+# Older langchain-openai has no http_async_client and hands http_client to
+# AsyncOpenAI as well, which breaks async calls - only share pools when both exist
+_CHAT_OPENAI_FIELDS = getattr(ChatOpenAI, "model_fields", None) or getattr(ChatOpenAI, "__fields__", {})
+_SHARE_HTTP_CLIENTS = "http_async_client" in _CHAT_OPENAI_FIELDS
+
+
+def _get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Get the shared sync/async HTTP clients (call with _CACHE_LOCK held)"""
+    global _HTTP_CLIENT, _HTTP_ASYNC_CLIENT
+    if _HTTP_CLIENT is None:
+        _HTTP_CLIENT = httpx.Client(http2=_HTTP2_AVAILABLE, limits=_HTTP_LIMITS)
+        _HTTP_ASYNC_CLIENT = httpx.AsyncClient(http2=_HTTP2_AVAILABLE, limits=_HTTP_LIMITS)
+    return _HTTP_CLIENT, _HTTP_ASYNC_CLIENT
+
+
+def _get_chat_llm(model: str, temperature: float, max_tokens: int) -> ChatOpenAI:
+    """Get a shared ChatOpenAI client for the given settings"""
+    key = (model, temperature, max_tokens)
+    with _CACHE_LOCK:
+        llm = _LLM_CACHE.get(key)
+        if llm is None:
+            clients = {}
+            if _SHARE_HTTP_CLIENTS:
+                clients["http_client"], clients["http_async_client"] = _get_http_clients()
+            llm = ChatOpenAI(
+                api_key=Config.OPENAI_API_KEY,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=getattr(Config, 'OPENAI_TIMEOUT', 60),
+                max_retries=getattr(Config, 'OPENAI_MAX_RETRIES', 3),
+                **clients
+            )
+            _LLM_CACHE[key] = llm
+        return llm
+
+
+# Async connections belong to the event loop that opened them, so a fresh
+# asyncio.run() per Flask request could never reuse them. The synchronous
+# entry points run coroutines on one long-lived loop in a daemon thread.
+# Its to_thread() work is database calls, so the default executor is sized to
+# the per-database connection pool rather than shared with the rest of the app.
+_AGENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run_on_agent_loop(coro, timeout: float):
+    """Run a coroutine on the shared agent event loop and wait up to timeout seconds for its result"""
+    global _AGENT_LOOP
+    with _CACHE_LOCK:
+        if _AGENT_LOOP is None:
+            _AGENT_LOOP = asyncio.new_event_loop()
+            _AGENT_LOOP.set_default_executor(
+                ThreadPoolExecutor(max_workers=POSTGRES_POOL_SIZE, thread_name_prefix="sql-agent-io")
+            )
+            threading.Thread(target=_AGENT_LOOP.run_forever, name="sql-agent-loop", daemon=True).start()
+    future = asyncio.run_coroutine_threadsafe(coro, _AGENT_LOOP)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # Cancels the coroutine on the loop too, so it stops holding connections
+        future.cancel()
+        raise
+
+
+@atexit.register
+def _close_http_clients():
+    """Close the shared HTTP connection pools at interpreter exit"""
+    if _HTTP_CLIENT is not None:
+        _HTTP_CLIENT.close()
+    if _HTTP_ASYNC_CLIENT is not None and _AGENT_LOOP is not None and _AGENT_LOOP.is_running():
+        try:
+            asyncio.run_coroutine_threadsafe(_HTTP_ASYNC_CLIENT.aclose(), _AGENT_LOOP).result(timeout=5)
+        except Exception:
+            pass
+
+
+def get_analysis_llm() -> ChatOpenAI:
+    """Shared GPT-4.1 client for query analysis and improvement"""
+    return _get_chat_llm(
+        getattr(Config, 'OPENAI_ANALYSIS_MODEL', 'gpt-4-turbo'),
+        getattr(Config, 'OPENAI_ANALYSIS_TEMPERATURE', 0.1),
+        getattr(Config, 'OPENAI_ANALYSIS_MAX_TOKENS', 1000)
+    )
+
+
+def get_execution_llm() -> ChatOpenAI:
+    """Shared GPT-4o-mini client for SQL generation and answer generation"""
+    return _get_chat_llm(
+        getattr(Config, 'OPENAI_EXECUTION_MODEL', 'gpt-4o-mini'),
+        getattr(Config, 'OPENAI_EXECUTION_TEMPERATURE', 0.1),
+        getattr(Config, 'OPENAI_EXECUTION_MAX_TOKENS', 4096)
+    )
+
+
+def get_sql_llm() -> ChatOpenAI:
+    """Shared GPT-4o-mini client with a small completion cap, for SQL and other short structured outputs"""
+    return _get_chat_llm(
+        getattr(Config, 'OPENAI_EXECUTION_MODEL', 'gpt-4o-mini'),
+        getattr(Config, 'OPENAI_EXECUTION_TEMPERATURE', 0.1),
+        getattr(Config, 'OPENAI_SQL_MAX_TOKENS', 1024)
+    )
+
+
+def get_answer_llm() -> ChatOpenAI:
+    """Shared GPT-4o-mini client for answer generation, capped at a readable response length"""
+    return _get_chat_llm(
+        getattr(Config, 'OPENAI_EXECUTION_MODEL', 'gpt-4o-mini'),
+        getattr(Config, 'OPENAI_EXECUTION_TEMPERATURE', 0.1),
+        getattr(Config, 'OPENAI_ANSWER_MAX_TOKENS', 2000)
+    )
+
+
 # ============================================================================
 # STATE MANAGEMENT FOR SQL AGENT
 # ============================================================================
@@ -81,7 +223,9 @@ class AgentState(TypedDict):
     max_attempts: int
     metadata: Dict[str, Any]
     final_answer: str
+    answer_template: str
     sql_error: bool
+    examples: str
 
 
 # ============================================================================
@@ -93,6 +237,14 @@ class ConvertToSQL(BaseModel):
     sql_query: str = Field(
         description="The SQL query corresponding to the user's natural language question."
     )
+    answer_template: str = Field(
+        default="",
+        description=(
+            "A short Jinja2 template answering the question from the query results. "
+            "It receives `rows` (list of dicts keyed by the SELECT column names/aliases) and `row_count`. "
+            "Leave empty if the answer needs analysis beyond restating the results."
+        )
+    )
 
 class RewrittenQuestion(BaseModel):
     """Model for question rewriting"""
@@ -100,11 +252,111 @@ class RewrittenQuestion(BaseModel):
         description="The rewritten question for better SQL generation."
     )
 
+class QuestionEquivalence(BaseModel):
+    """Model for semantic cache near-match verification"""
+    equivalent: bool = Field(
+        description="Whether both questions ask for exactly the same data, i.e. one SQL query answers both."
+    )
+
 
 # ============================================================================
 # SUMMARY DETECTION AND QUERY IMPROVEMENT WITH GPT-4.1
 # ============================================================================
 
+# Keyword fallback used when GPT-4.1 analysis is unavailable. With
+# pyahocorasick installed the phrases are matched in a single pass over the
+# question by an automaton built once at import; otherwise by one
+# precompiled alternation regex.
+SUMMARY_KEYWORDS = ('summary', 'overview', 'describe', 'stats', 'what is in', 'tell me about')
+
+# Questions are tokenized once; single words are a set lookup, phrases are
+# matched on the space-joined tokens so "stats" no longer fires inside "statsmodels"
+_TOKEN_RE = re.compile(r"[a-z/]+")
+_SUMMARY_WORDS = frozenset(keyword for keyword in SUMMARY_KEYWORDS if ' ' not in keyword)
+_SUMMARY_PHRASES = tuple(f" {keyword} " for keyword in SUMMARY_KEYWORDS if ' ' in keyword)
+
+try:
+    import ahocorasick
+    _SUMMARY_AUTOMATON = ahocorasick.Automaton()
+    for _phrase in _SUMMARY_PHRASES:
+        _SUMMARY_AUTOMATON.add_word(_phrase, _phrase)
+    _SUMMARY_AUTOMATON.make_automaton()
+except ImportError:
+    _SUMMARY_AUTOMATON = None
+    _SUMMARY_PHRASE_RE = re.compile("|".join(re.escape(phrase) for phrase in _SUMMARY_PHRASES))
+
+
+def is_summary_question(question: str) -> bool:
+    """Check whether a question asks for a table summary using keyword matching"""
+    tokens = _TOKEN_RE.findall(question.lower())
+    if not _SUMMARY_WORDS.isdisjoint(tokens):
+        return True
+    padded = f" {' '.join(tokens)} "
+    if _SUMMARY_AUTOMATON is not None:
+        return next(_SUMMARY_AUTOMATON.iter(padded), None) is not None
+    return _SUMMARY_PHRASE_RE.search(padded) is not None
+
+
+# Vocabulary that marks a question as being about the uploaded flight data.
+# Lexical hits skip the embedding check entirely.
+FLIGHT_DATA_WORDS = frozenset((
+    'flight', 'flights', 'fuel', 'aircraft', 'a/c', 'registration', 'registrations', 'tail',
+    'route', 'routes', 'origin', 'destination', 'icao', 'iata', 'airport', 'airports',
+    'block', 'departure', 'departures', 'arrival', 'arrivals', 'sector', 'sectors', 'leg',
+    'error', 'errors', 'data', 'dataset', 'table', 'tables', 'row', 'rows', 'record', 'records',
+    'column', 'columns', 'emission', 'emissions', 'co', 'corsia', 'consumption', 'airline',
+    'operator', 'plane', 'planes', 'fleet', 'type', 'types', 'distance', 'duration', 'summary',
+    'overview', 'stats', 'statistics', 'count', 'total', 'average', 'top', 'upload', 'uploaded', 'file'
+))
+
+# Prototype questions whose mean embedding represents "asks about the flight data"
+RELEVANCE_PROTOTYPES = (
+    "Which aircraft consumed the most fuel?",
+    "How many flights departed from each airport?",
+    "Show the busiest routes between origin and destination",
+    "What data quality errors were found in the upload?",
+    "Average block time per aircraft type",
+    "List the flights for registration N12345 last month",
+)
+
+_relevance_centroid: Optional[np.ndarray] = None
+
+
+async def ais_flight_data_question(question: str,
+                                   embedding_task: Optional["asyncio.Future"] = None) -> bool:
+    """
+    Cheap relevance gate run before any LLM call
+
+    Questions containing flight-data vocabulary pass immediately. Others are
+    embedded (the response cache's embedder) and compared to the centroid of
+    RELEVANCE_PROTOTYPES. Pass the cache's in-flight embedding_task to reuse
+    its vector instead of embedding the question again. Fails open when
+    embeddings are unavailable.
+    """
+    global _relevance_centroid
+    tokens = _TOKEN_RE.findall(question.lower())
+    if not FLIGHT_DATA_WORDS.isdisjoint(tokens):
+        return True
+
+    if _relevance_centroid is None:
+        vectors = await asyncio.gather(*(response_cache.aembed(p) for p in RELEVANCE_PROTOTYPES))
+        vectors = [v for v in vectors if v is not None]
+        if not vectors:
+            return True
+        centroid = np.mean(vectors, axis=0)
+        _relevance_centroid = centroid / np.linalg.norm(centroid)
+
+    if embedding_task is not None:
+        embedding = await asyncio.shield(embedding_task)
+    else:
+        embedding = await response_cache.aembed(question)
+    if embedding is None:
+        return True
+    similarity = float(embedding @ _relevance_centroid)
+    logger.info("🧭 Relevance similarity %.3f for: %s", similarity, question)
+    return similarity >= Config.RELEVANCE_THRESHOLD
+
+
 class QueryAnalysis(BaseModel):
     """Model for query analysis results"""
     is_summary_request: bool = Field(
@@ -124,18 +376,8 @@ class QueryAnalysis(BaseModel):
         description="Complexity level: simple, medium, complex"
     )
 
-def analyze_and_improve_query(question: str) -> QueryAnalysis:
-    """Use GPT-4.1 with function calling to analyze and improve the query"""
-    
-    # Initialize GPT-4.1 for query analysis
-    analysis_llm = ChatOpenAI(
-        api_key=Config.OPENAI_API_KEY,
-        model=getattr(Config, 'OPENAI_ANALYSIS_MODEL', 'gpt-4-turbo'),
-        temperature=getattr(Config, 'OPENAI_ANALYSIS_TEMPERATURE', 0.1),
-        max_tokens=getattr(Config, 'OPENAI_ANALYSIS_MAX_TOKENS', 1000)
-    )
-    
-    system_prompt = """You are an expert flight data analyst. Analyze user questions about flight operations data and improve them for better SQL query generation.
+# Static analysis prompt, parsed once at import
+ANALYSIS_SYSTEM_PROMPT = """You are an expert flight data analyst. Analyze user questions about flight operations data and improve them for better SQL query generation.
 
 AVAILABLE TABLES:
 - clean_flights: Main flight operations data with details like aircraft registration, routes, fuel consumption, timestamps
@@ -153,69 +395,336 @@ EXAMPLES:
 - "Tell me about the data" → Summary request for clean_flights table
 - "Which flights used the most fuel?" → Analytical query for clean_flights table
 """
-    
-    analysis_prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", "Analyze and improve this flight data question: {question}")
-    ])
+
+ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", ANALYSIS_SYSTEM_PROMPT),
+    ("human", "Analyze and improve this flight data question: {question}")
+])
+
+_query_analyzer = None
+
+
+def _get_query_analyzer():
+    """Get the analysis prompt piped into the shared GPT-4.1 structured-output client"""
+    global _query_analyzer
+    if _query_analyzer is None:
+        _query_analyzer = ANALYSIS_PROMPT | get_analysis_llm().with_structured_output(QueryAnalysis)
+    return _query_analyzer
+
+
+def _fallback_query_analysis(question: str) -> QueryAnalysis:
+    """Keyword-based analysis used when the GPT-4.1 call fails"""
+    return QueryAnalysis(
+        is_summary_request=is_summary_question(question),
+        improved_query=question,
+        target_table="error_flights" if "error" in question.lower() else "clean_flights",
+        query_type="exploratory",
+        complexity_level="medium"
+    )
+
+
+def _log_query_analysis(result: QueryAnalysis):
+    logger.info("🧠 GPT-4.1 Analysis - Summary: %s, Table: %s, Type: %s",
+                result.is_summary_request, result.target_table, result.query_type)
+    logger.info("📝 Improved query: %s", result.improved_query)
+
+
+def analyze_and_improve_query(question: str) -> QueryAnalysis:
+    """Use GPT-4.1 with function calling to analyze and improve the query"""
     
     try:
-        structured_llm = analysis_llm.with_structured_output(QueryAnalysis)
-        analyzer = analysis_prompt | structured_llm
-        result = analyzer.invoke({"question": question})
-        
-        logger.info(f"🧠 GPT-4.1 Analysis - Summary: {result.is_summary_request}, "
-                   f"Table: {result.target_table}, Type: {result.query_type}")
-        logger.info(f"📝 Improved query: {result.improved_query}")
+        result = _get_query_analyzer().invoke({"question": question})
+        _log_query_analysis(result)
+        return result
         
+    except Exception as e:
+        logger.error("Failed to analyze query with GPT-4.1: %s", e)
+        return _fallback_query_analysis(question)
+
+
+async def aanalyze_and_improve_query(question: str) -> QueryAnalysis:
+    """Async variant of analyze_and_improve_query"""
+    
+    try:
+        result = await _get_query_analyzer().ainvoke({"question": question})
+        _log_query_analysis(result)
         return result
         
     except Exception as e:
-        logger.error(f"Failed to analyze query with GPT-4.1: {e}")
-        # Fallback to simple analysis
-        return QueryAnalysis(
-            is_summary_request=any(keyword in question.lower() for keyword in [
-                'summary', 'overview', 'describe', 'stats', 'what is in', 'tell me about'
-            ]),
-            improved_query=question,
-            target_table="error_flights" if "error" in question.lower() else "clean_flights",
-            query_type="exploratory",
-            complexity_level="medium"
-        )
+        logger.error("Failed to analyze query with GPT-4.1: %s", e)
+        return _fallback_query_analysis(question)
+
+
+EQUIVALENCE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You check whether two questions about the same flight operations dataset ask for exactly the same "
+               "result. Different filters, limits, time ranges, tables or metrics mean they are NOT equivalent."),
+    ("human", "Question A: {cached_question}\nQuestion B: {question}")
+])
+
+
+def questions_equivalent(cached_question: str, question: str) -> bool:
+    """Confirm a semantic cache near match with one small GPT-4o-mini call"""
+    try:
+        checker = EQUIVALENCE_PROMPT | get_sql_llm().with_structured_output(QuestionEquivalence)
+        result = checker.invoke({"cached_question": cached_question, "question": question})
+        return bool(result.equivalent)
+    except Exception as e:
+        logger.warning("Could not verify cached question equivalence: %s", e)
+        return False
+
+
+_SUMMARY_NUMERIC_TYPES = ('integer', 'bigint', 'numeric', 'double precision', 'real', 'smallint', 'decimal')
+_SUMMARY_DATE_TYPES = ('date', 'timestamp', 'timestamp without time zone', 'timestamp with time zone')
+_SUMMARY_TEXT_TYPES = ('character varying', 'text', 'varchar', 'char')
+
+# Per-type aggregates for generate_table_summary, all computed in a single
+# scan of the table: (alias suffix, expression over the quoted column {c})
+_SUMMARY_STATS = {
+    'numeric': [
+        ('avg_value', 'ROUND(AVG({c})::numeric, 2)'),
+        ('min_value', 'MIN({c})'),
+        ('max_value', 'MAX({c})'),
+        ('std_dev', 'ROUND(STDDEV({c})::numeric, 2)'),
+        ('quartiles', 'PERCENTILE_CONT(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY {c})'),
+    ],
+    'date': [
+        ('earliest', 'MIN({c})'),
+        ('latest', 'MAX({c})'),
+        ('date_range', 'MAX({c}) - MIN({c})'),
+    ],
+    'text': [
+        ('distinct_count', 'COUNT(DISTINCT {c})'),
+        ('avg_length', 'AVG(LENGTH({c}))'),
+        ('min_length', 'MIN(LENGTH({c}))'),
+        ('max_length', 'MAX(LENGTH({c}))'),
+    ],
+}
+
+
+def _summary_kind(dtype: str) -> Optional[str]:
+    """Statistics group of a column type for generate_table_summary (None: nulls only)"""
+    if dtype in _SUMMARY_NUMERIC_TYPES:
+        return 'numeric'
+    if dtype in _SUMMARY_DATE_TYPES:
+        return 'date'
+    if dtype in _SUMMARY_TEXT_TYPES:
+        return 'text'
+    return None
+
+
+def _summary_stats_query(table_name: str, columns: List[Dict]) -> sql.Composed:
+    """One SELECT with the row count and every column's aggregates, aliased c<index>_<stat>"""
+    select_list = [sql.SQL("COUNT(*) AS total_rows")]
+    for index, col_info in enumerate(columns):
+        column = sql.Identifier(col_info['column_name'])
+        stats = [('non_null', 'COUNT({c})')] + _SUMMARY_STATS.get(_summary_kind(col_info['data_type']), [])
+        for suffix, expression in stats:
+            select_list.append(sql.SQL(expression + " AS {alias}").format(
+                c=column, alias=sql.Identifier(f"c{index}_{suffix}")
+            ))
+    return sql.SQL("SELECT {fields} FROM {table}").format(
+        fields=sql.SQL(", ").join(select_list), table=sql.Identifier(table_name)
+    )
 
 
-def generate_table_summary(db_manager, table_name: str, schema: str = 'public', max_top: int = 5) -> str:
-    """Generate a detailed summary of a PostgreSQL table with comprehensive statistics"""
+def _summary_top_values_query(table_name: str, text_columns: List[str], max_top: int) -> sql.Composed:
+    """Most frequent values of several columns in one UNION ALL statement (col_name, val, frequency)"""
+    table = sql.Identifier(table_name)
+    return sql.SQL(" UNION ALL ").join(
+        sql.SQL(
+            "(SELECT {name} AS col_name, {c}::text AS val, COUNT(*) AS frequency "
+            "FROM {table} WHERE {c} IS NOT NULL GROUP BY {c} ORDER BY frequency DESC LIMIT {limit})"
+        ).format(name=sql.Literal(col), c=sql.Identifier(col), table=table, limit=sql.Literal(max_top))
+        for col in text_columns
+    )
+
+
+# Extra sections for the known flight tables
+_SUMMARY_ROUTES_SQL = '''
+    SELECT 
+        "Origin ICAO" || ' → ' || "Destination ICAO" as route,
+        COUNT(*) as flight_count
+    FROM clean_flights
+    GROUP BY "Origin ICAO", "Destination ICAO"
+    ORDER BY flight_count DESC
+    LIMIT 5
+'''
+
+_SUMMARY_FUEL_SQL = '''
+    SELECT 
+        AVG("Block off Fuel" - "Block on Fuel") as avg_fuel_consumed,
+        MAX("Block off Fuel" - "Block on Fuel") as max_fuel_consumed
+    FROM clean_flights
+    WHERE "Block off Fuel" IS NOT NULL AND "Block on Fuel" IS NOT NULL
+'''
+
+_SUMMARY_ERRORS_SQL = '''
+    SELECT 
+        "Error_Category",
+        COUNT(*) as error_count,
+        ROUND(100.0 * COUNT(*) / SUM(COUNT(*)) OVER (), 2) as percentage
+    FROM error_flights
+    GROUP BY "Error_Category"
+    ORDER BY error_count DESC
+'''
+
+
+# Everything the overview needs in one round-trip: the column list (same
+# type names as information_schema), table size, the planner's row estimate,
+# whether its statistics are current (analyzed, no rows modified since), and
+# the per-column pg_stats rows (anyarray columns cast to text[] for JSON)
+_SUMMARY_CATALOG_SQL = """
+    SELECT
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'column_name', a.attname,
+                    'data_type', format_type(a.atttypid, NULL),
+                    'is_nullable', CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END
+                ) ORDER BY a.attnum), '[]'::json)
+         FROM pg_attribute a
+         WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped) AS columns,
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'attname', st.attname,
+                    'null_frac', st.null_frac,
+                    'n_distinct', st.n_distinct,
+                    'avg_width', st.avg_width,
+                    'most_common_vals', st.most_common_vals::text::text[],
+                    'most_common_freqs', st.most_common_freqs,
+                    'histogram_bounds', st.histogram_bounds::text::text[]
+                )), '[]'::json)
+         FROM pg_stats st
+         WHERE st.schemaname = %(schema)s AND st.tablename = %(table)s AND NOT st.inherited) AS column_stats,
+        c.reltuples::bigint AS estimated_rows,
+        pg_size_pretty(pg_total_relation_size(c.oid)) AS size,
+        COALESCE(s.last_analyze, s.last_autoanalyze) IS NOT NULL
+            AND COALESCE(s.n_mod_since_analyze, 0) = 0 AS stats_fresh
+    FROM pg_class c
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.oid = to_regclass(format('%%I.%%I', %(schema)s, %(table)s))
+"""
+
+
+def _format_estimate(value: float) -> str:
+    """Format an estimated statistic: whole numbers without decimals, others to two places"""
+    return f"{int(value):,}" if value.is_integer() else f"{value:,.2f}"
+
+
+def _estimated_column_lines(kind: Optional[str], stat: Dict, estimated_rows: int, max_top: int) -> List[str]:
+    """Column summary lines from a pg_stats row (no table scan)"""
+    null_frac = stat['null_frac'] or 0.0
+    lines = [f"- **Null Values**: ~{round(null_frac * estimated_rows):,} ({100 * null_frac:.2f}%)"]
+    histogram = stat['histogram_bounds'] or []
+    common_values = stat['most_common_vals'] or []
+    common_freqs = stat['most_common_freqs'] or []
     
-    # Use the database manager's connection
-    conn = db_manager.conn
-    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    if kind == 'numeric':
+        bounds = [float(v) for v in histogram]
+        values = sorted(bounds + [float(v) for v in common_values])
+        if values:
+            lines.append("\n**📈 Statistical Summary (estimated):**")
+            lines.append(f"- Min: {_format_estimate(values[0])}")
+            lines.append(f"- Max: {_format_estimate(values[-1])}")
+            if len(bounds) >= 2:
+                # Histogram buckets hold equal numbers of the non-most-common values
+                q1, median, q3 = (_format_estimate(bounds[round(q * (len(bounds) - 1))]) for q in (0.25, 0.5, 0.75))
+                lines.append(f"- Quartiles: Q1={q1}, Median={median}, Q3={q3}")
+    
+    elif kind == 'date':
+        # ISO-formatted dates/timestamps sort chronologically as text
+        values = sorted(histogram + common_values)
+        if values:
+            lines.append("\n**📅 Date Range (estimated):**")
+            lines.append(f"- Earliest: {values[0]}")
+            lines.append(f"- Latest: {values[-1]}")
+    
+    elif kind == 'text':
+        # Negative n_distinct is a fraction of the row count
+        n_distinct = stat['n_distinct'] or 0
+        distinct = n_distinct if n_distinct >= 0 else -n_distinct * estimated_rows
+        lines.append("\n**📝 Text Statistics (estimated):**")
+        lines.append(f"- Distinct Values: ~{round(distinct):,}")
+        lines.append(f"- Avg Width: {stat['avg_width']} bytes")
+        
+        # most_common_vals are ordered by frequency
+        top_values = list(zip(common_values, common_freqs))[:max_top]
+        if top_values:
+            lines.append(f"\n**🔝 Top {len(top_values)} Values:**")
+            for value, freq in top_values:
+                lines.append(f"- `~{round(freq * estimated_rows):,}x` → {value}")
+    
+    return lines
+
+
+def _summary_fetch(db_manager, query, params: Optional[Dict[str, Any]] = None) -> List[Dict]:
+    """Run one summary query on its own read-only connection (safe from worker threads)"""
+    with db_manager.read_connection() as conn:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+def generate_table_summary(db_manager, table_name: str, schema: str = 'public', max_top: int = 5,
+                           approximate: bool = True) -> str:
+    """Generate a detailed summary of a PostgreSQL table with comprehensive statistics
+
+    With approximate=True, a table whose planner statistics are current
+    (session tables are analyzed after loading) is summarized from
+    pg_class/pg_stats without scanning it; otherwise statistics are exact.
+    """
     
     try:
-        logger.info(f"📊 Generating summary for table: {table_name} in session: {db_manager.session_id}")
-        
-        # 1. Get column names and types
-        cursor.execute("""
-            SELECT 
-                column_name,
-                data_type,
-                is_nullable,
-                column_default
-            FROM information_schema.columns
-            WHERE table_schema = %s AND table_name = %s
-            ORDER BY ordinal_position
-        """, (schema, table_name))
-        columns = cursor.fetchall()
-        
-        # 2. Get total row count
-        cursor.execute(f'SELECT COUNT(*) as count FROM "{table_name}"')
-        total_rows = cursor.fetchone()['count']
-        
-        # 3. Get table size
-        cursor.execute("""
-            SELECT pg_size_pretty(pg_total_relation_size(%s)) as size
-        """, (table_name,))
-        table_size = cursor.fetchone()['size']
+        logger.info("📊 Generating summary for table: %s in session: %s", table_name, db_manager.session_id)
+        
+        # 1. Column names and types, table size and planner statistics in one query
+        catalog_rows = _summary_fetch(db_manager, _SUMMARY_CATALOG_SQL, {'schema': schema, 'table': table_name})
+        catalog = catalog_rows[0] if catalog_rows else None
+        columns = catalog['columns'] if catalog else []
+        table_size = catalog['size'] if catalog else "N/A"
+        
+        # 2. Use the planner statistics when they are current and cover every column
+        column_stats = None
+        if approximate and catalog and catalog['stats_fresh'] and catalog['estimated_rows'] >= 0:
+            column_stats = {row['attname']: row for row in catalog['column_stats']}
+            if any(c['column_name'] not in column_stats for c in columns):
+                column_stats = None
+        
+        # 3. The full-table scans - exact row count and per-column statistics,
+        # top values of every text column, flight-specific sections - run
+        # concurrently, each on its own pooled read-only connection. Workers
+        # are capped at the pool's free connections so none opens a direct one.
+        text_columns = [c['column_name'] for c in columns if _summary_kind(c['data_type']) == 'text']
+        queries = {}
+        if column_stats is None:
+            queries['stats'] = _summary_stats_query(table_name, columns)
+            if text_columns and max_top > 0:
+                queries['top_values'] = _summary_top_values_query(table_name, text_columns, max_top)
+        if table_name == 'clean_flights':
+            queries['routes'] = _SUMMARY_ROUTES_SQL
+            queries['fuel'] = _SUMMARY_FUEL_SQL
+        elif table_name == 'error_flights':
+            queries['errors'] = _SUMMARY_ERRORS_SQL
+        
+        results = {}
+        if queries:
+            workers = max(1, min(len(queries), db_manager.free_connections()))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="table-summary") as executor:
+                futures = {name: executor.submit(_summary_fetch, db_manager, query) for name, query in queries.items()}
+                results = {name: future.result() for name, future in futures.items()}
+        
+        if column_stats is None:
+            stats_row = results['stats'][0]
+            total_rows = stats_row['total_rows']
+            total_rows_text = f"{total_rows:,}"
+        else:
+            total_rows = catalog['estimated_rows']
+            total_rows_text = f"~{total_rows:,} (estimated from planner statistics)"
+        
+        # 4. Bucket the top values per text column
+        top_values_by_column: Dict[str, List[Dict]] = {}
+        for row in results.get('top_values', []):
+            top_values_by_column.setdefault(row['col_name'], []).append(row)
         
         # Start building summary
         summary = [
@@ -223,127 +732,75 @@ def generate_table_summary(db_manager, table_name: str, schema: str = 'public',
             f"\n**Session**: `{db_manager.session_id}`",
             f"**Database**: `{db_manager.db_name}`",
             f"\n## Overview",
-            f"- **Total Rows**: {total_rows:,}",
+            f"- **Total Rows**: {total_rows_text}",
             f"- **Total Columns**: {len(columns)}",
             f"- **Table Size**: {table_size}",
             f"\n## Column Details\n"
         ]
         
-        # 4. Analyze each column
-        for col_info in columns:
+        # 5. Analyze each column from the planner statistics or the aggregated row
+        for index, col_info in enumerate(columns):
             col = col_info['column_name']
             dtype = col_info['data_type']
             nullable = col_info['is_nullable']
+            kind = _summary_kind(dtype)
             
             summary.append(f"### 📋 Column: `{col}`")
             summary.append(f"- **Type**: {dtype}")
             summary.append(f"- **Nullable**: {nullable}")
             
-            # Get null count
-            cursor.execute(f'''
-                SELECT 
-                    COUNT(*) - COUNT("{col}") as null_count,
-                    ROUND(100.0 * (COUNT(*) - COUNT("{col}")) / COUNT(*), 2) as null_percentage
-                FROM "{table_name}"
-            ''')
-            null_info = cursor.fetchone()
-            summary.append(f"- **Null Values**: {null_info['null_count']:,} ({null_info['null_percentage']}%)")
+            if column_stats is not None:
+                summary.extend(_estimated_column_lines(kind, column_stats[col], total_rows, max_top))
+                summary.append("")
+                continue
+            
+            suffixes = ['non_null'] + [suffix for suffix, _ in _SUMMARY_STATS.get(kind, [])]
+            stats = {suffix: stats_row[f"c{index}_{suffix}"] for suffix in suffixes}
+            
+            null_count = total_rows - stats['non_null']
+            null_percentage = 100.0 * null_count / total_rows if total_rows else 0.0
+            summary.append(f"- **Null Values**: {null_count:,} ({null_percentage:.2f}%)")
             
             # Analyze based on data type
-            if dtype in ('integer', 'bigint', 'numeric', 'double precision', 'real', 'smallint', 'decimal'):
-                # Numeric analysis
-                cursor.execute(f'''
-                    SELECT 
-                        AVG("{col}")::numeric(10,2) AS avg_value,
-                        MIN("{col}") AS min_value,
-                        MAX("{col}") AS max_value,
-                        STDDEV("{col}")::numeric(10,2) AS std_dev,
-                        PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY "{col}") AS q1,
-                        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY "{col}") AS median,
-                        PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY "{col}") AS q3
-                    FROM "{table_name}"
-                    WHERE "{col}" IS NOT NULL
-                ''')
-                stats = cursor.fetchone()
-                
-                if stats and stats['avg_value'] is not None:
+            if kind == 'numeric':
+                if stats['avg_value'] is not None:
+                    q1, median, q3 = stats['quartiles']
                     summary.append("\n**📈 Statistical Summary:**")
                     summary.append(f"- Average: {stats['avg_value']:,.2f}")
                     summary.append(f"- Min: {stats['min_value']:,}")
                     summary.append(f"- Max: {stats['max_value']:,}")
                     summary.append(f"- Std Dev: {stats['std_dev']:,.2f}" if stats['std_dev'] else "- Std Dev: N/A")
-                    summary.append(f"- Quartiles: Q1={stats['q1']:,}, Median={stats['median']:,}, Q3={stats['q3']:,}")
+                    summary.append(f"- Quartiles: Q1={q1:,}, Median={median:,}, Q3={q3:,}")
                 
-            elif dtype in ('date', 'timestamp', 'timestamp without time zone', 'timestamp with time zone'):
-                # Date/time analysis
-                cursor.execute(f'''
-                    SELECT 
-                        MIN("{col}") AS earliest,
-                        MAX("{col}") AS latest,
-                        MAX("{col}") - MIN("{col}") AS date_range
-                    FROM "{table_name}"
-                    WHERE "{col}" IS NOT NULL
-                ''')
-                date_stats = cursor.fetchone()
-                
-                if date_stats and date_stats['earliest']:
+            elif kind == 'date':
+                if stats['earliest']:
                     summary.append("\n**📅 Date Range:**")
-                    summary.append(f"- Earliest: {date_stats['earliest']}")
-                    summary.append(f"- Latest: {date_stats['latest']}")
-                    summary.append(f"- Range: {date_stats['date_range']}")
-                
-            elif dtype in ('character varying', 'text', 'varchar', 'char'):
-                # Text analysis
-                cursor.execute(f'''
-                    SELECT 
-                        COUNT(DISTINCT "{col}") as distinct_count,
-                        AVG(LENGTH("{col}")) as avg_length,
-                        MIN(LENGTH("{col}")) as min_length,
-                        MAX(LENGTH("{col}")) as max_length
-                    FROM "{table_name}"
-                    WHERE "{col}" IS NOT NULL
-                ''')
-                text_stats = cursor.fetchone()
+                    summary.append(f"- Earliest: {stats['earliest']}")
+                    summary.append(f"- Latest: {stats['latest']}")
+                    summary.append(f"- Range: {stats['date_range']}")
                 
-                if text_stats:
-                    summary.append("\n**📝 Text Statistics:**")
-                    summary.append(f"- Distinct Values: {text_stats['distinct_count']:,}")
-                    summary.append(f"- Avg Length: {text_stats['avg_length']:.1f}" if text_stats['avg_length'] else "- Avg Length: N/A")
-                    summary.append(f"- Length Range: {text_stats['min_length']} - {text_stats['max_length']}")
+            elif kind == 'text':
+                summary.append("\n**📝 Text Statistics:**")
+                summary.append(f"- Distinct Values: {stats['distinct_count']:,}")
+                summary.append(f"- Avg Length: {stats['avg_length']:.1f}" if stats['avg_length'] else "- Avg Length: N/A")
+                summary.append(f"- Length Range: {stats['min_length']} - {stats['max_length']}")
                 
-                # Top values
-                cursor.execute(f'''
-                    SELECT "{col}", COUNT(*) AS frequency
-                    FROM "{table_name}"
-                    WHERE "{col}" IS NOT NULL
-                    GROUP BY "{col}"
-                    ORDER BY frequency DESC
-                    LIMIT %s
-                ''', (max_top,))
-                top_values = cursor.fetchall()
+                # Top values (UNION ALL branches do not guarantee row order)
+                top_values = sorted(top_values_by_column.get(col, []), key=lambda row: row['frequency'], reverse=True)
                 
                 if top_values:
                     summary.append(f"\n**🔝 Top {len(top_values)} Values:**")
                     for row in top_values:
-                        summary.append(f"- `{row['frequency']:,}x` → {row[col]}")
+                        summary.append(f"- `{row['frequency']:,}x` → {row['val']}")
             
             summary.append("")  # Add blank line between columns
         
-        # 5. Add any special analysis for flight data tables
+        # 6. Add any special analysis for flight data tables
         if table_name == 'clean_flights':
             summary.append("\n## ✈️ Flight-Specific Analysis")
             
             # Most common routes
-            cursor.execute('''
-                SELECT 
-                    "Origin ICAO" || ' → ' || "Destination ICAO" as route,
-                    COUNT(*) as flight_count
-                FROM clean_flights
-                GROUP BY "Origin ICAO", "Destination ICAO"
-                ORDER BY flight_count DESC
-                LIMIT 5
-            ''')
-            routes = cursor.fetchall()
+            routes = results['routes']
             
             if routes:
                 summary.append("\n**Most Common Routes:**")
@@ -351,14 +808,7 @@ def generate_table_summary(db_manager, table_name: str, schema: str = 'public',
                     summary.append(f"- {route['route']}: {route['flight_count']:,} flights")
             
             # Fuel efficiency stats
-            cursor.execute('''
-                SELECT 
-                    AVG("Block off Fuel" - "Block on Fuel") as avg_fuel_consumed,
-                    MAX("Block off Fuel" - "Block on Fuel") as max_fuel_consumed
-                FROM clean_flights
-                WHERE "Block off Fuel" IS NOT NULL AND "Block on Fuel" IS NOT NULL
-            ''')
-            fuel_stats = cursor.fetchone()
+            fuel_stats = results['fuel'][0] if results['fuel'] else None
             
             if fuel_stats and fuel_stats['avg_fuel_consumed']:
                 summary.append("\n**⛽ Fuel Consumption:**")
@@ -369,40 +819,433 @@ def generate_table_summary(db_manager, table_name: str, schema: str = 'public',
             summary.append("\n## ❌ Error Analysis")
             
             # Error distribution
-            cursor.execute('''
-                SELECT 
-                    "Error_Category",
-                    COUNT(*) as error_count,
-                    ROUND(100.0 * COUNT(*) / SUM(COUNT(*)) OVER (), 2) as percentage
-                FROM error_flights
-                GROUP BY "Error_Category"
-                ORDER BY error_count DESC
-            ''')
-            errors = cursor.fetchall()
+            errors = results['errors']
             
             if errors:
                 summary.append("\n**Error Distribution:**")
                 for error in errors:
                     summary.append(f"- {error['Error_Category']}: {error['error_count']} ({error['percentage']}%)")
         
-        cursor.close()
-        logger.info(f"✅ Generated summary for {table_name}: {len(summary)} lines")
+        logger.info("✅ Generated summary for %s: %s lines", table_name, len(summary))
         return "\n".join(summary)
         
     except Exception as e:
-        if cursor:
-            cursor.close()
-        logger.error(f"Failed to generate table summary: {e}")
+        logger.error("Failed to generate table summary: %s", e)
         raise
 
 
+# ============================================================================
+# CANNED SQL TEMPLATES FOR WELL-KNOWN QUESTIONS
+# ============================================================================
+
+# Common questions map onto a handful of fixed queries, so they skip every LLM
+# round-trip: the SQL runs directly and the answer is rendered from a small
+# Jinja template. Patterns must match the whole question (after whitespace and
+# trailing punctuation are normalized): any extra qualifier - a date range,
+# "lowest", "per hour" - changes the meaning, so those questions go to the LLM.
+# Captured groups are validated before substitution (LIMITs are clamped
+# integers, ICAO codes are exactly four upper-case letters), so no user text
+# reaches the SQL unchecked.
+#
+# Each entry: (name, pattern, sql, answer template)
+_TEMPLATES: List[Tuple[str, re.Pattern, str, Template]] = [
+    (
+        "top_aircraft_by_fuel",
+        re.compile(
+            r"(?:(?:show|list|give)(?: me)? |what are )?(?:the )?top (\d{1,4}) aircraft "
+            r"(?:by|with the (?:most|highest)) fuel(?: consumption| usage| burn| consumed)?",
+            re.IGNORECASE
+        ),
+        'SELECT "A/C Registration", SUM("Block off Fuel" - "Block on Fuel") AS fuel_consumed '
+        'FROM clean_flights '
+        'GROUP BY "A/C Registration" '
+        'ORDER BY fuel_consumed DESC NULLS LAST '
+        'LIMIT {0}',
+        Template(
+            "## ⛽ Top {{ rows|length }} Aircraft by Fuel Consumption\n\n"
+            "{% for row in rows %}"
+            "{{ loop.index }}. `{{ row['A/C Registration'] }}` → {{ '{:,.2f}'.format(row['fuel_consumed'] or 0) }}\n"
+            "{% else %}No fuel data found.\n{% endfor %}"
+        )
+    ),
+    (
+        "flights_between_airports",
+        re.compile(
+            r"(?:(?:show|list|find)(?: me)? )?(?:all )?(?:the )?flights? "
+            r"from ((?-i:[A-Z]{4})) to ((?-i:[A-Z]{4}))",
+            re.IGNORECASE
+        ),
+        'SELECT * FROM clean_flights '
+        'WHERE "Origin ICAO" = \'{0}\' AND "Destination ICAO" = \'{1}\' '
+        # "Date" is loaded as dd/mm/yyyy text - sorting the text orders by day of month
+        'ORDER BY to_date("Date", \'DD/MM/YYYY\') '
+        'LIMIT 1000',
+        Template(
+            "## ✈️ Flights from {{ params[0] }} to {{ params[1] }}\n\n"
+            "{% if rows %}Found **{{ rows|length }}** flights on this route"
+            "{% if rows|length >= 1000 %} (showing the earliest 1,000){% endif %}.\n"
+            "{% else %}No flights found on this route.\n{% endif %}"
+        )
+    ),
+    (
+        "average_fuel_by_aircraft_type",
+        re.compile(
+            r"(?:(?:show|list|give)(?: me)? |what is |what's )?(?:the )?average fuel"
+            r"(?: consumption| usage| burn| consumed)? (?:by|per|for each) (?:aircraft|a/c) type",
+            re.IGNORECASE
+        ),
+        'SELECT "A/C Type", AVG("Block off Fuel" - "Block on Fuel") AS avg_fuel_consumed, '
+        'COUNT(*) AS flight_count '
+        'FROM clean_flights '
+        'GROUP BY "A/C Type" '
+        'ORDER BY avg_fuel_consumed DESC NULLS LAST',
+        Template(
+            "## ⛽ Average Fuel Consumption by Aircraft Type\n\n"
+            "{% for row in rows %}"
+            "- `{{ row['A/C Type'] }}`: {{ '{:,.2f}'.format(row['avg_fuel_consumed'] or 0) }}"
+            " ({{ '{:,}'.format(row['flight_count']) }} flights)\n"
+            "{% else %}No fuel data found.\n{% endfor %}"
+        )
+    ),
+]
+
+
+_TEMPLATE_QUESTION_SPACE_RE = re.compile(r"\s+")
+
+
+def _validate_template_param(value: str) -> str:
+    """Validate a captured template group: clamp integers, accept upper-case ICAO codes"""
+    if value.isdigit():
+        return str(min(max(int(value), 1), 1000))
+    if len(value) == 4 and value.isalpha() and value.isupper():
+        return value
+    raise ValueError(f"Unexpected template parameter: {value!r}")
+
+
+def match_sql_template(question: str) -> Optional[Tuple[str, str, List[str], Template]]:
+    """Return (name, sql, params, answer template) for a well-known question, or None"""
+    question = _TEMPLATE_QUESTION_SPACE_RE.sub(" ", question).strip().rstrip("?.! ")
+    for name, pattern, sql_template, answer_template in _TEMPLATES:
+        match = pattern.fullmatch(question)
+        if match:
+            params = [_validate_template_param(group) for group in match.groups()]
+            return name, sql_template.format(*params), params, answer_template
+    return None
+
+
+# Answer templates returned alongside generated SQL come from the model, so
+# they are rendered in a sandbox (no attribute access to Python internals).
+# Undefined names raise instead of rendering as blanks, so a template that
+# references a column the query did not return falls back to the answer LLM.
+_ANSWER_TEMPLATE_ENV = SandboxedEnvironment(undefined=StrictUndefined)
+
+
+def render_answer_template(answer_template: str, rows: List[Dict]) -> Optional[str]:
+    """Render a model-written answer template over query rows (None if it fails or renders empty)"""
+    try:
+        rendered = _ANSWER_TEMPLATE_ENV.from_string(answer_template).render(rows=rows, row_count=len(rows))
+    except Exception as e:
+        logger.warning("Answer template could not be rendered, falling back to LLM answer: %s", e)
+        return None
+    return rendered.strip() or None
+
+
+# Long free-text values in the answer sample are cut to this many characters
+ANSWER_SAMPLE_MAX_CHARS = 200
+
+
+def compact_sample_rows(rows: List[Dict], max_chars: int = ANSWER_SAMPLE_MAX_CHARS) -> List[Dict]:
+    """Shrink answer-prompt sample rows: drop all-NULL columns, truncate long strings"""
+    if not rows:
+        return []
+    columns = [c for c in rows[0] if any(row.get(c) is not None for row in rows)]
+    compacted = []
+    for row in rows:
+        item = {}
+        for column in columns:
+            value = row.get(column)
+            if isinstance(value, str) and len(value) > max_chars:
+                value = value[:max_chars] + "…"
+            item[column] = value
+        compacted.append(item)
+    return compacted
+
+
+# Single-row results with at most this many columns (COUNT(*), SUM(...), one
+# lookup) are answered without the answer LLM
+DIRECT_ANSWER_MAX_COLUMNS = 3
+
+
+# Only aggregate-looking columns get thousands separators; years, flight
+# numbers and other identifiers are printed as-is ("2024", not "2,024")
+_AGGREGATE_COLUMN_RE = re.compile(r"(?:^|_)(?:count|sum|avg|average|total)(?:_|$)", re.IGNORECASE)
+
+
+def _format_answer_value(column: str, value: Any) -> str:
+    """Format one result value for a direct answer"""
+    if isinstance(value, bool) or value is None:
+        return str(value)
+    grouping = "," if _AGGREGATE_COLUMN_RE.search(column) else ""
+    if isinstance(value, int):
+        return f"{value:{grouping}}"
+    if isinstance(value, (float, Decimal)):
+        return f"{value:{grouping}.2f}"
+    return str(value)
+
+
+def format_direct_answer(question: str, rows: List[Dict]) -> Optional[str]:
+    """Deterministic answer for empty and single small-row results (None when the LLM is needed)"""
+    if not rows:
+        return f"No results found for: {question}"
+    if len(rows) == 1 and len(rows[0]) <= DIRECT_ANSWER_MAX_COLUMNS:
+        return ", ".join(
+            f"{column.replace('_', ' ')}: {_format_answer_value(column, value)}"
+            for column, value in rows[0].items()
+        )
+    return None
+
+
+# ============================================================================
+# LOCAL SQL VALIDATION
+# ============================================================================
+
+# Generated SQL is checked locally before it reaches PostgreSQL: a single
+# read-only statement, with a LIMIT appended when the outer query has none.
+# Rejections go straight to the regenerate step instead of costing a database
+# round-trip. With sqlglot installed the statement is parsed; otherwise fall
+# back to prefix / semicolon / trailing-LIMIT checks.
+try:
+    import sqlglot
+    from sqlglot import exp
+except ImportError:
+    sqlglot = None
+
+_SQL_FENCE_RE = re.compile(r"^\s*```(?:sql)?\s*|\s*```\s*$", re.IGNORECASE)
+_WRITE_EXPRESSIONS = (
+    (exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop)
+    if sqlglot is not None else ()
+)
+_READ_PREFIX_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_TRAILING_LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+)(\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+
+# Database errors that no rewrite of the question can fix: the workflow ends
+# instead of spending another LLM call and execution on them
+_FATAL_SQL_ERROR_RE = re.compile(
+    r"connection (?:refused|reset|already closed|to server)|server closed the connection|could not connect"
+    r"|permission denied|could not translate host|timeout expired|authentication failed",
+    re.IGNORECASE,
+)
+
+
+def is_fatal_sql_error(error_message: str) -> bool:
+    """True for connection/permission errors that regenerating the SQL cannot fix"""
+    return bool(error_message) and _FATAL_SQL_ERROR_RE.search(error_message) is not None
+
+
+def validate_generated_sql(sql_query: str, default_limit: int = None) -> Tuple[Optional[str], Optional[str]]:
+    """Return (sql to execute, None) or (None, error message) for LLM-generated SQL"""
+    default_limit = default_limit or Config.DEFAULT_QUERY_LIMIT
+    # Models occasionally wrap the statement in a markdown code fence
+    sql_query = _SQL_FENCE_RE.sub("", sql_query).strip().rstrip(";").strip()
+    if not sql_query:
+        return None, "No SQL query generated"
+
+    if sqlglot is not None:
+        try:
+            statements = [s for s in sqlglot.parse(sql_query, read="postgres") if s is not None]
+        except sqlglot.errors.ParseError as e:
+            return None, f"Could not parse SQL: {e}"
+        if len(statements) != 1:
+            return None, "Only a single SQL statement is allowed"
+        tree = statements[0]
+        has_limit = tree.args.get("limit") is not None
+        # A parenthesized top level parses as a Subquery/Paren around the query
+        while isinstance(tree, (exp.Subquery, exp.Paren)):
+            tree = tree.this
+            has_limit = has_limit or tree.args.get("limit") is not None
+        # exp.Query covers SELECT and set operations (UNION/EXCEPT/INTERSECT)
+        if not isinstance(tree, exp.Query):
+            return None, "Only SELECT queries are allowed"
+        # Data-modifying CTEs and SELECT ... INTO still write
+        if tree.find(*_WRITE_EXPRESSIONS) is not None or any(
+            select.args.get("into") is not None for select in tree.find_all(exp.Select)
+        ):
+            return None, "Only read-only queries are allowed"
+    else:
+        if ";" in sql_query:
+            return None, "Only a single SQL statement is allowed"
+        if not _READ_PREFIX_RE.match(sql_query):
+            return None, "Only SELECT queries are allowed"
+        has_limit = _TRAILING_LIMIT_RE.search(sql_query) is not None
+
+    if not has_limit:
+        sql_query = f"{sql_query}\nLIMIT {default_limit}"
+    return sql_query, None
+
+
+# ============================================================================
+# SQL GENERATION PROMPT
+# ============================================================================
+
+# MAKE SURE TO UPDATE THIS PROMPT FOR ALL THE FUEL TYPES
+# Ordered static instructions -> session schema -> question, so the prefix is
+# byte-identical across calls and earns OpenAI's automatic prompt caching.
+# The schema is bound once per agent via SQL_PROMPT.partial(schema=...), so a
+# call only substitutes the question. Substituted values are not re-parsed as
+# templates, so the schema needs no curly-brace escaping.
+SQL_GENERATION_SYSTEM_PROMPT = (
+    "You are an expert SQL generator for flight operations data using PostgreSQL.\n\n"
+    "KEY POINTS:\n"
+    "1. Use double quotes for column names with spaces or special characters\n"
+    "2. PostgreSQL is case-sensitive for quoted identifiers\n"
+    "3. For date comparisons, use proper PostgreSQL date functions\n"
+    "4. Handle NULL values appropriately\n"
+    "5. Use LIMIT to prevent overwhelming results\n\n"
+    "FUEL CALCULATIONS:\n"
+    "- Fuel consumed = \"Block off Fuel\" - \"Block on Fuel\"\n"
+    "- If the schema lists fuel_by_registration, prefer it for per-aircraft fuel totals, averages and rankings "
+    "(one row per \"A/C Registration\" with \"A/C Type\", flight_count, total_fuel_consumed, avg_fuel_consumed)\n\n"
+    "Generate ONLY the SQL query without any explanation or markdown formatting. "
+    "For simple lookups, counts and rankings also return answer_template: a brief Jinja2 template over "
+    "`rows` and `row_count` that states the answer; leave it empty when the results need real analysis.\n\n"
+    "DATABASE SCHEMA:\n"
+    "{schema}\n"
+)
+
+# Few-shot examples go in the human message, after the cacheable system prefix
+SQL_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SQL_GENERATION_SYSTEM_PROMPT),
+    ("human", "{examples}Convert this question to SQL: {question}")
+])
+
+
+def format_sql_examples(examples: List[Tuple[str, str]]) -> str:
+    """Render (question, sql) pairs as a few-shot block for SQL_PROMPT (empty if none)"""
+    if not examples:
+        return ""
+    lines = ["Questions answered successfully on this dataset before:"]
+    for example_question, example_sql in examples:
+        lines.append(f"Q: {example_question}\nSQL: {example_sql}")
+    return "\n\n".join(lines) + "\n\n"
+
+
+# Static answer instructions first and the per-query context last, so every
+# answer request shares the same cacheable prefix. Question, SQL and result
+# data are template variables, so braces in them need no escaping.
+ANSWER_SYSTEM_PROMPT = """You are an expert flight operations data analyst using GPT-4o-mini for complex analysis. 
+Your task is to convert SQL query results into clear, comprehensive, and insightful natural language responses.
+
+ANALYSIS REQUIREMENTS:
+1. Provide specific numbers, statistics, and quantitative insights
+2. Identify patterns, trends, and anomalies in the data
+3. Offer operational insights relevant to flight operations
+4. Use professional aviation terminology where appropriate
+5. Structure the response with clear sections and key findings
+6. Highlight any data quality issues or limitations
+
+RESPONSE FORMAT:
+- Start with a concise summary of key findings
+- Provide detailed analysis with specific metrics
+- Include operational recommendations if relevant
+- End with any caveats or additional insights"""
+
+ANSWER_INSTRUCTION = "Provide a comprehensive analysis and answer to the original question based on this flight operations data."
+
+ANSWER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", ANSWER_SYSTEM_PROMPT),
+    ("human",
+     "Original Question: {question}\n\n"
+     "SQL Query Executed: {sql_query}\n\n"
+     "Query Results Summary:\n"
+     "- Total rows returned: {row_count}\n"
+     "- Data sample (first {sample_count} rows):\n\n"
+     "{data}\n\n"
+     + ANSWER_INSTRUCTION)
+])
+
+# Question rewrite after a failed execution; the error is a template variable,
+# so braces in it need no escaping
+REWRITE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are an expert flight data analyst using GPT-4.1 for query improvement.\n"
+     "Given the original question and the SQL execution error, rewrite the question to be more specific, "
+     "clearer, and likely to generate working SQL. Consider the database schema and common SQL pitfalls.\n\n"
+     "COMMON ISSUES TO AVOID:\n"
+     "- Column name case sensitivity and special characters\n"
+     "- Missing table qualifiers\n"
+     "- Incorrect date/time formats\n"
+     "- Ambiguous joins or relationships\n"
+     "- NULL value handling\n\n"
+     "Preserve all necessary details for accurate data retrieval while making the question more SQL-friendly."),
+    ("human",
+     "Original Question: {question}\nSQL Error encountered: {error_message}\n\n"
+     "Rewrite the question to avoid this error and be more specific for SQL generation:")
+])
+
+_question_rewriter = None
+
+
+def _get_question_rewriter():
+    """Get the rewrite prompt piped into the shared GPT-4.1 structured-output client"""
+    global _question_rewriter
+    if _question_rewriter is None:
+        _question_rewriter = REWRITE_PROMPT | get_analysis_llm().with_structured_output(RewrittenQuestion)
+    return _question_rewriter
+
+
+# Batch requests use plain JSON mode instead of the structured-output tool call
+BATCH_JSON_INSTRUCTION = (
+    "Respond with a JSON object with the keys \"sql_query\" (the SQL query) and "
+    "\"answer_template\" (may be an empty string)."
+)
+
+
+def _record_cached_tokens(state: AgentState, message: Any) -> Dict[str, Any]:
+    """Add the prompt tokens OpenAI served from its prompt cache to the state metadata (returned for the node update)"""
+    usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    metadata = state.setdefault("metadata", {})
+    metadata["cache_hit_tokens"] = metadata.get("cache_hit_tokens", 0) + cached_tokens
+    return metadata
+
+
 # ============================================================================
 # POSTGRESQL SQL AGENT WITH LANGGRAPH
 # ============================================================================
 
+def _agent_node(method_name: str, is_async: bool):
+    """Graph node that calls the named method of the agent in config["configurable"]["agent"]"""
+    if is_async:
+        async def node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+            return await getattr(config["configurable"]["agent"], method_name)(state)
+    else:
+        def node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+            return getattr(config["configurable"]["agent"], method_name)(state)
+    node.__name__ = method_name
+    return node
+
+
 class FlightDataPostgreSQLAgent:
     """SQL Agent using LangGraph for PostgreSQL with GPT-4.1 analysis and GPT-4o-mini execution"""
     
+    # Agents are built per request; per-database setup is shared by all of
+    # them through these LRU caches (most recently used session databases):
+    # get_table_schemas(): db_name -> (schema fingerprint, table info)
+    # _get_sql_prompt():   db_name -> (schema fingerprint, schema text, bound SQL prompt)
+    _schemas_cache: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+    _sql_prompts_cache: "OrderedDict[str, Tuple[str, str, ChatPromptTemplate]]" = OrderedDict()
+    _schemas_cache_lock = threading.Lock()
+    SHARED_CACHE_SIZE = 64
+    
+    # Questions currently being answered, shared by all agents so concurrent
+    # identical questions run the pipeline once: (db_name, normalized question) -> Future
+    _inflight: Dict[Tuple[str, str], Future] = {}
+    _inflight_lock = threading.Lock()
+    
+    # The workflow topology never varies, so it is compiled once per process;
+    # each run passes its agent in config["configurable"]["agent"]
+    _workflow = None
+    
     def __init__(self, db_manager, session_id: str = None, max_attempts: int = 3):
         """Initialize SQL Agent with existing database manager"""
         
@@ -415,41 +1258,53 @@ class FlightDataPostgreSQLAgent:
         
         self.db_manager = db_manager
         
-        # Get SQLAlchemy engine for LangChain
-        self.engine = create_engine(self.db_manager.get_connection_string())
+        # Schema prompt text and the SQL prompt bound to it, built once on
+        # first use (session tables are static)
+        self._schema_cache: Optional[str] = None
+        self._sql_prompt: Optional[ChatPromptTemplate] = None
+        self._schema_fingerprint: Optional[str] = None
+        # Table info validated by this agent; an agent lives for one request,
+        # so the fingerprint query runs at most once per request
+        self._table_info: Optional[Dict[str, Any]] = None
         
-        # Initialize GPT-4.1 for query analysis and improvement
-        self.analysis_llm = ChatOpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            model=getattr(Config, 'OPENAI_ANALYSIS_MODEL', 'gpt-4-turbo'),
-            temperature=getattr(Config, 'OPENAI_ANALYSIS_TEMPERATURE', 0.1),
-            max_tokens=getattr(Config, 'OPENAI_ANALYSIS_MAX_TOKENS', 1000)
-        )
+        # Shared GPT-4.1 client for query analysis and improvement
+        self.analysis_llm = get_analysis_llm()
         
-        # Initialize GPT-4o-mini for SQL generation and answer generation
-        self.execution_llm = ChatOpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            model=getattr(Config, 'OPENAI_EXECUTION_MODEL', 'gpt-4o-mini'),
-            temperature=getattr(Config, 'OPENAI_EXECUTION_TEMPERATURE', 0.1),
-            max_tokens=getattr(Config, 'OPENAI_EXECUTION_MAX_TOKENS', 4096)
-        )
+        # Shared GPT-4o-mini client for SQL generation and answer generation
+        self.execution_llm = get_execution_llm()
+        
+        # Same model capped at Config.OPENAI_SQL_MAX_TOKENS - room for a statement and its answer template
+        self.sql_llm = get_sql_llm()
+        self.answer_llm = get_answer_llm()
+        # Structured-output binding built once; raw message kept for usage stats
+        self._sql_structured_llm = self.sql_llm.with_structured_output(ConvertToSQL, include_raw=True)
         
-        # Build the workflow
-        self._build_workflow()
+        # Shared compiled workflow
+        self.app = self._get_workflow()
         
-        logger.info(f"🚀 Successfully initialized PostgreSQL SQL Agent with dual LLM setup for session: {self.session_id}")
-        logger.info(f"🧠 Analysis LLM: gpt-4-turbo | 🔧 Execution LLM: gpt-4o-mini")
+        logger.info("🚀 Successfully initialized PostgreSQL SQL Agent with dual LLM setup for session: %s", self.session_id)
+        logger.info("🧠 Analysis LLM: gpt-4-turbo | 🔧 Execution LLM: gpt-4o-mini")
     
-    def _build_workflow(self):
+    @classmethod
+    def _get_workflow(cls):
+        """Get the compiled LangGraph workflow, building it on first use"""
+        with _CACHE_LOCK:
+            if cls._workflow is None:
+                cls._workflow = cls._build_workflow()
+            return cls._workflow
+    
+    @classmethod
+    def _build_workflow(cls):
         """Build the LangGraph workflow for SQL agent"""
         workflow = StateGraph(AgentState)
         
-        # Add nodes
-        workflow.add_node("convert_to_sql", self._convert_nl_to_sql)
-        workflow.add_node("execute_sql", self._execute_sql)
-        workflow.add_node("generate_human_readable_answer", self._generate_human_readable_answer)
-        workflow.add_node("regenerate_query", self._regenerate_query)
-        workflow.add_node("end_max_iterations", self._end_max_iterations)
+        # Add nodes (dispatch to the agent of the current run)
+        workflow.add_node("convert_to_sql", _agent_node("_convert_nl_to_sql", is_async=True))
+        workflow.add_node("execute_sql", _agent_node("_execute_sql", is_async=False))
+        workflow.add_node("generate_human_readable_answer",
+                          _agent_node("_generate_human_readable_answer", is_async=True))
+        workflow.add_node("regenerate_query", _agent_node("_regenerate_query", is_async=True))
+        workflow.add_node("end_max_iterations", _agent_node("_end_max_iterations", is_async=False))
         
         # Set entry point
         workflow.set_entry_point("convert_to_sql")
@@ -460,16 +1315,17 @@ class FlightDataPostgreSQLAgent:
         # Add conditional edges
         workflow.add_conditional_edges(
             "execute_sql",
-            self._execute_sql_router,
+            cls._execute_sql_router,
             {
                 "generate_answer": "generate_human_readable_answer",
                 "regenerate": "regenerate_query",
+                "fatal": "end_max_iterations",
             }
         )
         
         workflow.add_conditional_edges(
             "regenerate_query",
-            self._check_attempts_router,
+            cls._check_attempts_router,
             {
                 "retry": "convert_to_sql",
                 "max_iterations": "end_max_iterations",
@@ -481,16 +1337,24 @@ class FlightDataPostgreSQLAgent:
         workflow.add_edge("end_max_iterations", END)
         
         # Compile the workflow
-        self.app = workflow.compile()
+        app = workflow.compile()
         logger.info("✅ SQL Agent workflow compiled successfully")
+        return app
     
-    def _get_database_schema(self) -> str:
+    def _get_database_schema(self, table_info: Optional[Dict[str, Any]] = None) -> str:
         """Get database schema information using the session database manager"""
+        # Every SQL generation attempt needs the schema; introspect only once
+        if self._schema_cache is not None:
+            return self._schema_cache
+        
         try:
-            # Use the database manager's get_table_info method
-            table_info = self.db_manager.get_table_info()
+            if table_info is None:
+                table_info = self.get_table_schemas()
             schema = ""
             
+            # Sample rows for every table in a single round-trip
+            samples = self.db_manager.get_table_samples(list(table_info.keys()), limit=3)
+            
             for table_name, info in table_info.items():
                 schema += f"\nTable: {table_name} ({info['row_count']} rows)\n"
                 
@@ -501,298 +1365,548 @@ class FlightDataPostgreSQLAgent:
                     
                     schema += f"  - {col_name}: {col_type} {nullable}\n"
                 
-                # Add sample data using the database manager
-                try:
-                    sample_data, error = self.db_manager.execute_query(f'SELECT * FROM "{table_name}" LIMIT 3')
-                    if not error and sample_data:
-                        schema += "  Sample data:\n"
-                        for row in sample_data:
-                            schema += f"    {dict(row)}\n"
-                except Exception as e:
-                    logger.warning(f"Could not get sample data for {table_name}: {e}")
+                sample_data = samples.get(table_name)
+                if sample_data:
+                    schema += "  Sample data:\n"
+                    for row in sample_data:
+                        schema += f"    {row}\n"
             
-            logger.info(f"📋 Retrieved schema for {len(table_info)} tables from session database")
+            logger.info("📋 Retrieved schema for %s tables from session database", len(table_info))
+            if table_info:
+                self._schema_cache = schema
             return schema
             
         except Exception as e:
-            logger.error(f"Failed to get database schema: {e}")
+            logger.error("Failed to get database schema: %s", e)
             return "Error: Could not retrieve database schema"
     
-    def _convert_nl_to_sql(self, state: AgentState) -> AgentState:
-        """Convert natural language question to SQL query using GPT-4o-mini"""
-        question = state["question"]
-        schema = self._get_database_schema()
+    def _get_sql_prompt(self) -> ChatPromptTemplate:
+        """Get the SQL generation prompt with the session schema already bound"""
+        if self._sql_prompt is not None:
+            return self._sql_prompt
         
-        logger.info(f"🔄 Converting question to SQL using GPT-4o-mini: {question}")
+        # A previous agent for this database may already have rendered it;
+        # get_table_schemas() revalidates the fingerprint (one cheap query)
+        db_name = self.db_manager.db_name
+        table_info = self.get_table_schemas()
+        with self._schemas_cache_lock:
+            cached = self._sql_prompts_cache.get(db_name)
+            if cached and cached[0] == self._schema_fingerprint:
+                self._sql_prompts_cache.move_to_end(db_name)
+        if cached and self._schema_fingerprint is not None and cached[0] == self._schema_fingerprint:
+            self._schema_cache, self._sql_prompt = cached[1], cached[2]
+            return self._sql_prompt
         
-
-
-
-
-        """MAKE SURE TO UPDATE THIS CODE FOR ALL THE FUEL TYPES"""
-        # Escape curly braces in schema for prompt template
-        safe_schema = schema.replace('{', '{{').replace('}', '}}')
-        system_prompt = (
-            "You are an expert SQL generator for flight operations data using PostgreSQL.\n\n"
-            "DATABASE SCHEMA:\n"
-            f"{safe_schema}\n\n"
-            "KEY POINTS:\n"
-            "1. Use double quotes for column names with spaces or special characters\n"
-            "2. PostgreSQL is case-sensitive for quoted identifiers\n"
-            "3. For date comparisons, use proper PostgreSQL date functions\n"
-            "4. Handle NULL values appropriately\n"
-            "5. Use LIMIT to prevent overwhelming results\n\n"
-            "FUEL CALCULATIONS:\n"
-            "- Fuel consumed = \"Block off Fuel\" - \"Block on Fuel\"\n\n"
-            "Generate ONLY the SQL query without any explanation or markdown formatting.\n"
-        )
+        schema = self._get_database_schema(table_info)
+        sql_prompt = SQL_PROMPT.partial(schema=schema)
+        if self._schema_cache is not None:
+            self._sql_prompt = sql_prompt
+            if self._schema_fingerprint is not None:
+                self._put_shared(self._sql_prompts_cache, db_name,
+                                 (self._schema_fingerprint, schema, sql_prompt))
+        return sql_prompt
+    
+    # Nodes return only the state keys they change; LangGraph merges them into
+    # the running state instead of rewriting every channel after each step.
+    # LLM nodes are coroutines on the async OpenAI client, so concurrent
+    # questions (aprocess_queries) share the event loop instead of a thread
+    # each; the database node stays sync and LangGraph runs it in an executor.
+    
+    async def _convert_nl_to_sql(self, state: AgentState) -> Dict[str, Any]:
+        """Convert natural language question to SQL query using GPT-4o-mini"""
+        question = state["question"]
+        # First use may introspect the schema (blocking database calls)
+        convert_prompt = await asyncio.to_thread(self._get_sql_prompt)
         
-        convert_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "Convert this question to SQL: {question}")
-        ])
+        logger.info("🔄 Converting question to SQL using GPT-4o-mini: %s", question)
         
         try:
             # Use GPT-4o-mini for SQL generation
-            structured_llm = self.execution_llm.with_structured_output(ConvertToSQL)
-            sql_generator = convert_prompt | structured_llm
-            result = sql_generator.invoke({"question": question})
-            
-            # Handle structured output
-            if isinstance(result, dict):
-                state["sql_query"] = result.get("sql_query", "")
-            else:
-                state["sql_query"] = getattr(result, "sql_query", "")
+            sql_generator = convert_prompt | self._sql_structured_llm
+            output = await sql_generator.ainvoke({"question": question, "examples": state.get("examples", "")})
+            metadata = _record_cached_tokens(state, output.get("raw"))
+            if output.get("parsing_error"):
+                raise output["parsing_error"]
+            # Typed ConvertToSQL instance - no free-text parsing needed
+            result = output.get("parsed")
+            sql_query = result.sql_query if result is not None else ""
+            answer_template = result.answer_template if result is not None else ""
+            raw = output.get("raw")
+            if answer_template and raw is not None and raw.response_metadata.get("finish_reason") == "length":
+                # The template shares the completion cap with the SQL - a cut-off one is not trusted
+                logger.warning("SQL completion hit the token cap, dropping its answer template")
+                answer_template = ""
             
-            logger.info(f"📊 Generated SQL with GPT-4o-mini: {state['sql_query']}")
+            logger.info("📊 Generated SQL with GPT-4o-mini: %s", sql_query)
+            return {"sql_query": sql_query, "answer_template": answer_template, "metadata": metadata}
             
         except Exception as e:
-            logger.error(f"Failed to generate SQL: {e}")
-            state["sql_query"] = ""
-            state["error_message"] = str(e)
-        
-        return state
+            logger.error("Failed to generate SQL: %s", e)
+            return {"sql_query": "", "error_message": str(e)}
     
-    def _execute_sql(self, state: AgentState) -> AgentState:
+    def _execute_sql(self, state: AgentState) -> Dict[str, Any]:
         """Execute the SQL query"""
         sql_query = state.get("sql_query", "").strip()
         
         if not sql_query:
-            state["sql_error"] = True
-            state["error_message"] = "No SQL query generated"
-            return state
-        
-        logger.info(f"🔍 Executing SQL query: {sql_query[:200]}...")
+            return {"sql_error": True, "error_message": "No SQL query generated"}
+
+        sql_query, validation_error = validate_generated_sql(sql_query)
+        if validation_error:
+            logger.warning("Generated SQL rejected before execution: %s", validation_error)
+            return {
+                "sql_error": True,
+                "error_message": validation_error,
+                "query_result": f"Error: {validation_error}"
+            }
+
+        logger.info("🔍 Executing SQL query: %s...", sql_query[:200])
         
         try:
-            # Execute query using db_manager
-            data, error = self.db_manager.execute_query(sql_query)
-            
+            # Validation admits only a single SELECT/WITH statement: stream it
+            # through a server-side cursor and stop at MAX_QUERY_ROWS instead
+            # of materializing arbitrarily large result sets
+            data, error = self._fetch_streamed(sql_query, Config.MAX_QUERY_ROWS)
+
             if error:
-                state["sql_error"] = True
-                state["error_message"] = error
-                state["query_result"] = f"Error: {error}"
-                logger.error(f"SQL execution error: {error}")
-            else:
-                state["sql_error"] = False
-                state["query_rows"] = data
-                state["success"] = True
-                
-                # Format result for display
-                if data:
-                    if sql_query.upper().startswith("SELECT"):
-                        state["query_result"] = f"Found {len(data)} results"
-                    else:
-                        affected_rows = data[0].get('affected_rows', 0)
-                        state["query_result"] = f"Query executed successfully. {affected_rows} rows affected."
-                else:
-                    state["query_result"] = "No results found"
-                
-                logger.info(f"✅ SQL query executed successfully: {len(data)} rows")
+                logger.error("SQL execution error: %s", error)
+                return {
+                    "sql_query": sql_query,
+                    "sql_error": True,
+                    "error_message": error,
+                    "query_result": f"Error: {error}"
+                }
+            
+            # Format result for display
+            query_result = f"Found {len(data)} results" if data else "No results found"
+            
+            logger.info("✅ SQL query executed successfully: %s rows", len(data))
+            return {
+                "sql_query": sql_query,
+                "sql_error": False,
+                "query_rows": data,
+                "success": True,
+                "query_result": query_result
+            }
                 
         except Exception as e:
-            state["sql_error"] = True
-            state["error_message"] = str(e)
-            state["query_result"] = f"Execution error: {str(e)}"
-            logger.error(f"SQL execution failed: {e}")
-        
-        return state
+            logger.error("SQL execution failed: %s", e)
+            return {
+                "sql_query": sql_query,
+                "sql_error": True,
+                "error_message": str(e),
+                "query_result": f"Execution error: {str(e)}"
+            }
     
-    def _generate_human_readable_answer(self, state: AgentState) -> AgentState:
+    def _fetch_streamed(self, sql_query: str, max_rows: int) -> Tuple[List[Dict], Optional[str]]:
+        """Collect at most max_rows rows from a streamed SELECT"""
+        rows: List[Dict] = []
+        # A server-side cursor only pays off when the result can exceed
+        # max_rows; a small outer LIMIT is fetched in a single round-trip
+        limit_match = _TRAILING_LIMIT_RE.search(sql_query)
+        server_side = limit_match is None or int(limit_match.group(1)) > max_rows
+        try:
+            batches = self.db_manager.iter_query(sql_query, server_side=server_side)
+            try:
+                for batch in batches:
+                    rows.extend(batch[:max_rows - len(rows)])
+                    if len(rows) >= max_rows:
+                        logger.warning("Result truncated at %s rows", max_rows)
+                        break
+            finally:
+                batches.close()
+        except Exception as e:
+            logger.error("Query execution failed: %s", e)
+            return [], str(e)
+        return rows, None
+
+    async def _generate_human_readable_answer(self, state: AgentState) -> Dict[str, Any]:
         """Generate a human-readable answer from query results using GPT-4o-mini for complex analysis"""
         sql_query = state.get("sql_query", "")
         query_rows = state.get("query_rows", [])
         question = state["question"]
         
-        logger.info("📝 Generating human-readable answer with GPT-4o-mini")
+        # Small results: the template returned with the SQL answers without a second LLM call
+        answer_template = state.get("answer_template")
+        if answer_template and query_rows and len(query_rows) <= Config.TEMPLATED_ANSWER_MAX_ROWS:
+            rendered = render_answer_template(answer_template, query_rows)
+            if rendered:
+                logger.info("📝 Answered from the SQL step's answer template")
+                return {"final_answer": rendered}
         
-        # Limit data for context window
-        sample_data = query_rows[:50] if query_rows else []
+        # Empty results and single small rows (aggregates, lookups) need no LLM call either
+        direct_answer = format_direct_answer(question, query_rows)
+        if direct_answer:
+            logger.info("📝 Answered directly from the query result")
+            return {"final_answer": direct_answer}
         
-        system_prompt = """You are an expert flight operations data analyst using GPT-4o-mini for complex analysis. 
-Your task is to convert SQL query results into clear, comprehensive, and insightful natural language responses.
-
-ANALYSIS REQUIREMENTS:
-1. Provide specific numbers, statistics, and quantitative insights
-2. Identify patterns, trends, and anomalies in the data
-3. Offer operational insights relevant to flight operations
-4. Use professional aviation terminology where appropriate
-5. Structure the response with clear sections and key findings
-6. Highlight any data quality issues or limitations
-
-RESPONSE FORMAT:
-- Start with a concise summary of key findings
-- Provide detailed analysis with specific metrics
-- Include operational recommendations if relevant
-- End with any caveats or additional insights"""
+        logger.info("📝 Generating human-readable answer with GPT-4o-mini")
         
-        # Build context based on results
-        if not query_rows:
-            context = "The query returned no results."
-        else:
-            context = f"""
-Original Question: {question}
-
-SQL Query Executed: {sql_query}
-
-Query Results Summary:
-- Total rows returned: {len(query_rows)}
-- Data sample (first {len(sample_data)} rows):
-
-{json.dumps(sample_data, indent=2, default=str)}
-"""
+        # Limit data for context window
+        sample_data = query_rows[:50]
         
-        # Escape curly braces in context for prompt template
-        safe_context = context.replace('{', '{{').replace('}', '}}')
-        generate_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", safe_context + "\n\nProvide a comprehensive analysis and answer to the original question based on this flight operations data.")
-        ])
+        # Precompiled prompt: fill in only the per-query values
+        inputs = {
+            "question": question,
+            "sql_query": sql_query,
+            "row_count": len(query_rows),
+            "sample_count": len(sample_data),
+            # Compact JSON without empty columns or long text: only costs prompt tokens
+            "data": dumps_json(compact_sample_rows(sample_data)),
+        }
         
         try:
             # Use GPT-4o-mini for complex analysis and answer generation
-            chain = generate_prompt | self.execution_llm | StrOutputParser()
-            answer = chain.invoke({})
-            state["final_answer"] = answer
+            chain = ANSWER_PROMPT | self.answer_llm
+            message = await chain.ainvoke(inputs)
+            metadata = _record_cached_tokens(state, message)
             logger.info("✅ Generated comprehensive analysis with GPT-4o-mini")
+            return {"final_answer": message.content, "metadata": metadata}
             
         except Exception as e:
-            logger.error(f"Failed to generate answer: {e}")
-            state["final_answer"] = f"Found {len(query_rows)} results but could not generate comprehensive analysis."
-        
-        return state
+            logger.error("Failed to generate answer: %s", e)
+            return {"final_answer": f"Found {len(query_rows)} results but could not generate comprehensive analysis."}
     
-    def _regenerate_query(self, state: AgentState) -> AgentState:
+    async def _regenerate_query(self, state: AgentState) -> Dict[str, Any]:
         """Regenerate the SQL query by rewriting the question using GPT-4.1"""
         question = state["question"]
         error_message = state.get("error_message", "")
         
-        logger.info(f"🔄 Regenerating query with GPT-4.1 (attempt {state['attempts'] + 1}/{state['max_attempts']})")
-        
-        # Escape curly braces in error_message for prompt template
-        safe_error_message = error_message.replace('{', '{{').replace('}', '}}')
-        system_prompt = (
-            "You are an expert flight data analyst using GPT-4.1 for query improvement.\n"
-            "Given the original question and the SQL execution error, rewrite the question to be more specific, "
-            "clearer, and likely to generate working SQL. Consider the database schema and common SQL pitfalls.\n\n"
-            "COMMON ISSUES TO AVOID:\n"
-            "- Column name case sensitivity and special characters\n"
-            "- Missing table qualifiers\n"
-            "- Incorrect date/time formats\n"
-            "- Ambiguous joins or relationships\n"
-            "- NULL value handling\n\n"
-            "Preserve all necessary details for accurate data retrieval while making the question more SQL-friendly."
-        )
-        rewrite_prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", f"""Original Question: {{question}}\nSQL Error encountered: {safe_error_message}\n\nRewrite the question to avoid this error and be more specific for SQL generation:""")
-        ])
+        logger.info("🔄 Regenerating query with GPT-4.1 (attempt %s/%s)", state['attempts'] + 1, state['max_attempts'])
         
         try:
             # Use GPT-4.1 for intelligent query rewriting
-            structured_llm = self.analysis_llm.with_structured_output(RewrittenQuestion)
-            rewriter = rewrite_prompt | structured_llm
-            result = rewriter.invoke({})
+            rewriter = _get_question_rewriter()
+            result = await rewriter.ainvoke({"question": question, "error_message": error_message})
             
             # Handle structured output
             if isinstance(result, dict):
-                state["question"] = result.get("question", "")
+                rewritten = result.get("question", "")
             else:
-                state["question"] = getattr(result, "question", "")
+                rewritten = getattr(result, "question", "")
             
-            state["attempts"] += 1
-            logger.info(f"📝 GPT-4.1 rewritten question: {state['question']}")
+            logger.info("📝 GPT-4.1 rewritten question: %s", rewritten)
+            return {"question": rewritten, "attempts": state["attempts"] + 1}
             
         except Exception as e:
-            logger.error(f"Failed to rewrite question with GPT-4.1: {e}")
-            state["attempts"] += 1
-        
-        return state
+            logger.error("Failed to rewrite question with GPT-4.1: %s", e)
+            return {"attempts": state["attempts"] + 1}
     
-    def _end_max_iterations(self, state: AgentState) -> AgentState:
-        """Handle max iterations reached"""
+    def _end_max_iterations(self, state: AgentState) -> Dict[str, Any]:
+        """Handle max iterations reached (or a database error that retrying cannot fix)"""
+        error_message = state.get('error_message', 'Unknown error')
+        if is_fatal_sql_error(error_message):
+            logger.warning("⚠️ Database error cannot be fixed by regenerating the query")
+            final_answer = (
+                f"I was unable to run your query against the database. "
+                f"Error: {error_message}. "
+                "Please try again later or contact support."
+            )
+            return {"final_answer": final_answer, "query_result": final_answer, "success": False}
+        
         logger.warning("⚠️ Maximum attempts reached")
-        state["final_answer"] = (
+        final_answer = (
             f"I was unable to process your query after {state['max_attempts']} attempts. "
-            f"Last error: {state.get('error_message', 'Unknown error')}. "
+            f"Last error: {error_message}. "
             "Please try rephrasing your question or contact support."
         )
-        state["query_result"] = state["final_answer"]
-        state["success"] = False
-        return state
+        return {"final_answer": final_answer, "query_result": final_answer, "success": False}
     
-    def _execute_sql_router(self, state: AgentState) -> str:
+    @staticmethod
+    def _execute_sql_router(state: AgentState) -> str:
         """Route based on SQL execution result"""
         if not state.get("sql_error", False):
             return "generate_answer"
-        else:
-            return "regenerate"
+        if is_fatal_sql_error(state.get("error_message", "")):
+            return "fatal"
+        return "regenerate"
     
-    def _check_attempts_router(self, state: AgentState) -> str:
+    @staticmethod
+    def _check_attempts_router(state: AgentState) -> str:
         """Route based on number of attempts"""
         if state["attempts"] < state["max_attempts"]:
             return "retry"
         else:
             return "max_iterations"
     
+    def _process_template_query(self, question: str, template_match: Tuple[str, str, List[str], Template],
+                                session_id: str) -> Optional[Dict[str, Any]]:
+        """Run canned SQL directly and render the answer without any LLM call"""
+        name, sql_query, params, answer_template = template_match
+        logger.info("📌 Question matched canned SQL template %s: %s", name, sql_query)
+        
+        data, error = self._fetch_streamed(sql_query, Config.MAX_QUERY_ROWS)
+        if error:
+            # Schema differs from what the template expects - let the LLM handle it
+            logger.warning("Canned SQL failed, falling back to LLM workflow: %s", error)
+            return None
+        
+        return {
+            "success": True,
+            "answer": answer_template.render(rows=data, params=params),
+            "metadata": {
+                "sql_query": sql_query,
+                "row_count": len(data),
+                "attempts": 0,
+                "session_id": session_id,
+                "database": self.db_manager.db_name,
+                "method": "template",
+                "template_hit": name,
+                "original_question": question
+            },
+            "table_rows": data
+        }
+    
     def process_query(self, question: str, session_id: str = None) -> Dict[str, Any]:
+        """Synchronous entry point for Flask routes; runs aprocess_query on the shared agent loop"""
+        return _run_on_agent_loop(self.aprocess_query(question, session_id), Config.AGENT_REQUEST_TIMEOUT)
+    
+    def process_queries(self, questions: List[str], session_id: str = None,
+                        max_concurrency: int = 4) -> List[Dict[str, Any]]:
+        """Synchronous entry point for answering several independent questions concurrently"""
+        rounds = math.ceil(len(questions) / max(1, max_concurrency)) or 1
+        return _run_on_agent_loop(
+            self.aprocess_queries(questions, session_id, max_concurrency),
+            Config.AGENT_REQUEST_TIMEOUT * rounds
+        )
+    
+    async def aprocess_queries(self, questions: List[str], session_id: str = None,
+                               max_concurrency: int = 4) -> List[Dict[str, Any]]:
+        """Answer independent questions concurrently, at most max_concurrency in flight (results in input order)"""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run(question: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.aprocess_query(question, session_id)
+        
+        return list(await asyncio.gather(*(run(question) for question in questions)))
+    
+    def batch_generate_sql(self, questions: List[str], poll_interval: float = 30.0,
+                           timeout: float = 24 * 3600) -> List[Dict[str, Any]]:
+        """
+        Generate and run SQL for many questions through the OpenAI Batch API
+        
+        For offline evaluation runs, not interactive use: batch requests cost
+        half as much and have separate rate limits, but complete within a 24h
+        window. Only the SQL step is batched (no analysis, retries or answer
+        generation). Returns one dict per question, in input order, with
+        question, sql_query, rows and error.
+        """
+        from openai import OpenAI
+        
+        client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        sql_prompt = self._get_sql_prompt()
+        model = getattr(Config, 'OPENAI_EXECUTION_MODEL', 'gpt-4o-mini')
+        roles = {"system": "system", "human": "user", "ai": "assistant"}
+        
+        lines = []
+        for index, question in enumerate(questions):
+            messages = [{"role": roles[m.type], "content": m.content}
+                        for m in sql_prompt.format_messages(question=question, examples="")]
+            messages.append({"role": "system", "content": BATCH_JSON_INSTRUCTION})
+            lines.append(json.dumps({
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "messages": messages,
+                    "temperature": getattr(Config, 'OPENAI_EXECUTION_TEMPERATURE', 0.1),
+                    "max_tokens": getattr(Config, 'OPENAI_SQL_MAX_TOKENS', 1024),
+                    "response_format": {"type": "json_object"}
+                }
+            }))
+        
+        batch_file = client.files.create(file=("sql_batch.jsonl", "\n".join(lines).encode()), purpose="batch")
+        batch = client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions",
+                                      completion_window="24h")
+        logger.info("📦 Submitted OpenAI batch %s with %s questions", batch.id, len(questions))
+        
+        deadline = time.monotonic() + timeout
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"OpenAI batch {batch.id} still {batch.status} after {timeout}s")
+            time.sleep(poll_interval)
+            batch = client.batches.retrieve(batch.id)
+        
+        results = [{"question": q, "sql_query": "", "rows": [], "error": f"Batch {batch.status}"}
+                   for q in questions]
+        if not batch.output_file_id:
+            return results
+        
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            item = json.loads(line)
+            result = results[int(item["custom_id"])]
+            try:
+                content = item["response"]["body"]["choices"][0]["message"]["content"]
+                sql_query, error = validate_generated_sql(ConvertToSQL.model_validate_json(content).sql_query)
+            except Exception as e:
+                sql_query, error = None, f"Unusable batch response: {e}"
+            if error:
+                result["error"] = error
+                continue
+            result["sql_query"] = sql_query
+            result["rows"], result["error"] = self._fetch_streamed(sql_query, Config.MAX_QUERY_ROWS)
+        
+        logger.info("📦 OpenAI batch %s finished: %s", batch.id, batch.status)
+        return results
+    
+    async def aprocess_query(self, question: str, session_id: str = None) -> Dict[str, Any]:
+        """
+        Answer a question, overlapping the cache embedding with the LLM pipeline
+        
+        The exact-match cache tier is checked first. Concurrent identical
+        questions against the same database then share one pipeline run.
+        """
         session_id = session_id or self.session_id
-        logger.info(f"🔍 Processing query for session: {session_id}")
-        logger.info(f"🗄️ Using database: {self.db_manager.db_name}")
-        logger.info(f"❓ Original question: {question}")
+        namespace = self.db_manager.db_name
+        
+        # Answers are specific to the session's dataset, so cache per database
+        if Config.ENABLE_RESPONSE_CACHE:
+            if Config.PERSIST_RESPONSE_CACHE and response_cache.claim_warmup(namespace):
+                persisted = await asyncio.to_thread(self.db_manager.load_cached_responses, response_cache.ttl)
+                response_cache.warm(namespace, persisted)
+            cached = response_cache.lookup_exact(namespace, question)
+            if cached is not None:
+                cached["metadata"]["session_id"] = session_id
+                return cached
+        
+        key = (namespace, normalize_question(question))
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_leader:
+            logger.info("⏳ Joining in-flight run of identical question: %s", question)
+            response = copy.deepcopy(await asyncio.wrap_future(future))
+            response.setdefault("metadata", {})["session_id"] = session_id
+            return response
+        
+        try:
+            response = await self._aprocess_cache_miss(question, session_id)
+        except BaseException as e:
+            # Waiters must not hang if the leader fails or is cancelled
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+        return response
+    
+    async def _aprocess_cache_miss(self, question: str, session_id: str) -> Dict[str, Any]:
+        """
+        Run the pipeline for a question that missed the exact cache tier
+        
+        The question embedding (semantic tier) and the analysis/SQL pipeline
+        start together; a semantic hit cancels the pipeline, otherwise the
+        embedding is reused to store the fresh response.
+        """
+        if not Config.ENABLE_RESPONSE_CACHE:
+            return await self._aprocess_query_uncached(question, session_id)
+        
+        namespace = self.db_manager.db_name
+        # The pipeline also reads the embedding (few-shot examples), by which time it is ready
+        embedding_task = asyncio.create_task(response_cache.aembed(question))
+        pipeline = asyncio.create_task(self._aprocess_query_uncached(question, session_id, embedding_task))
+        embedding = await embedding_task
+        cached = await asyncio.to_thread(
+            response_cache.lookup_semantic, namespace, question, embedding, questions_equivalent
+        )
+        if cached is not None:
+            pipeline.cancel()
+            cached["metadata"]["session_id"] = session_id
+            return cached
+        
+        response = await pipeline
+        response.setdefault("metadata", {})["cache_hit"] = False
+        response_cache.store(namespace, question, response, embedding)
+        if Config.PERSIST_RESPONSE_CACHE and response.get("success"):
+            await asyncio.to_thread(
+                self.db_manager.save_cached_response,
+                normalize_question(question), question,
+                embedding.tolist() if embedding is not None else None, response
+            )
+        return response
+    
+    async def _aprocess_query_uncached(self, question: str, session_id: str,
+                                       embedding_task: Optional["asyncio.Task"] = None) -> Dict[str, Any]:
+        """Run the full template / summary / LangGraph pipeline for a question"""
+        logger.info("🔍 Processing query for session: %s", session_id)
+        logger.info("🗄️ Using database: %s", self.db_manager.db_name)
+        logger.info("❓ Original question: %s", question)
+
+        # --- STEP 0: CANNED SQL FOR WELL-KNOWN QUESTIONS ---
+        template_match = match_sql_template(question)
+        if template_match:
+            template_response = await asyncio.to_thread(
+                self._process_template_query, question, template_match, session_id
+            )
+            if template_response:
+                return template_response
+
+        # --- STEP 0b: REJECT UNRELATED QUESTIONS BEFORE ANY LLM CALL ---
+        if Config.ENABLE_RELEVANCE_GATE and not await ais_flight_data_question(question, embedding_task):
+            logger.info("🚫 Question not related to the flight data: %s", question)
+            return {
+                "success": False,
+                "answer": (
+                    "This question does not appear to be about the uploaded flight data. "
+                    "Try asking about flights, aircraft, fuel, routes or data errors."
+                ),
+                "error": "Question not relevant to flight data",
+                "metadata": {
+                    "session_id": session_id,
+                    "database": self.db_manager.db_name,
+                    "method": "relevance_gate",
+                    "original_question": question
+                }
+            }
+
+        # Build (or revalidate) the schema-bound SQL prompt while GPT-4.1
+        # analyzes the question; on a cold session this hides the schema reads
+        prompt_task = asyncio.create_task(asyncio.to_thread(self._get_sql_prompt))
 
         # --- STEP 1: ANALYZE AND IMPROVE QUERY WITH GPT-4.1 ---
         try:
-            query_analysis = analyze_and_improve_query(question)
+            query_analysis = await aanalyze_and_improve_query(question)
             improved_question = query_analysis.improved_query
             target_table = query_analysis.target_table
             is_summary = query_analysis.is_summary_request
             query_type = query_analysis.query_type
             complexity = query_analysis.complexity_level
             
-            logger.info(f"🧠 GPT-4.1 Analysis Complete:")
-            logger.info(f"   - Summary Request: {is_summary}")
-            logger.info(f"   - Target Table: {target_table}")
-            logger.info(f"   - Query Type: {query_type}")
-            logger.info(f"   - Complexity: {complexity}")
-            logger.info(f"   - Improved Question: {improved_question}")
+            logger.info("🧠 GPT-4.1 Analysis Complete:")
+            logger.info("   - Summary Request: %s", is_summary)
+            logger.info("   - Target Table: %s", target_table)
+            logger.info("   - Query Type: %s", query_type)
+            logger.info("   - Complexity: %s", complexity)
+            logger.info("   - Improved Question: %s", improved_question)
             
         except Exception as e:
-            logger.error(f"Failed to analyze query with GPT-4.1: {e}")
+            logger.error("Failed to analyze query with GPT-4.1: %s", e)
             # Fallback to original question
             improved_question = question
             target_table = 'error_flights' if 'error' in question.lower() else 'clean_flights'
-            is_summary = any(keyword in question.lower() for keyword in [
-                'summary', 'overview', 'describe', 'stats', 'what is in', 'tell me about'
-            ])
+            is_summary = is_summary_question(question)
             query_type = "exploratory"
             complexity = "medium"
 
+        # Finish the schema reads before anything else uses the connection
+        try:
+            await prompt_task
+        except Exception as e:
+            logger.warning("Could not prepare the SQL prompt ahead of generation: %s", e)
+
         # --- STEP 2: HANDLE SUMMARY REQUESTS ---
         if is_summary:
-            logger.info(f"📊 Processing summary request for table: {target_table}")
+            logger.info("📊 Processing summary request for table: %s", target_table)
             try:
-                summary_md = generate_table_summary(self.db_manager, target_table)
+                summary_md = await asyncio.to_thread(generate_table_summary, self.db_manager, target_table)
                 return {
                     "success": True,
                     "answer": summary_md,
@@ -809,7 +1923,7 @@ Query Results Summary:
                     }
                 }
             except Exception as e:
-                logger.error(f"Failed to generate summary: {e}")
+                logger.error("Failed to generate summary: %s", e)
                 return {
                     "success": False,
                     "answer": f"Could not generate summary for {target_table}: {e}",
@@ -825,7 +1939,15 @@ Query Results Summary:
                 }
 
         # --- STEP 3: NORMAL FLOW WITH IMPROVED QUESTION ---
-        logger.info(f"🔄 Processing analytical query with improved question")
+        logger.info("🔄 Processing analytical query with improved question")
+        
+        # Earlier successful questions on this database as few-shot examples
+        examples = ""
+        if embedding_task is not None and Config.FEW_SHOT_EXAMPLES > 0:
+            embedding = await asyncio.shield(embedding_task)
+            examples = format_sql_examples(response_cache.similar_sql_examples(
+                self.db_manager.db_name, embedding, Config.FEW_SHOT_EXAMPLES, Config.FEW_SHOT_MIN_SIMILARITY
+            ))
         
         # Ensure max_attempts is always an integer
         max_attempts = self.max_attempts if isinstance(self.max_attempts, int) and self.max_attempts > 0 else 3
@@ -850,11 +1972,16 @@ Query Results Summary:
                 "database": self.db_manager.db_name
             },
             "final_answer": "",
-            "sql_error": False
+            "answer_template": "",
+            "sql_error": False,
+            "examples": examples
         }
         
         try:
-            result = self.app.invoke(initial_state)
+            # Bound the whole retry loop, not just each LLM call
+            result = await asyncio.wait_for(
+                self.app.ainvoke(initial_state, config={"configurable": {"agent": self}}),
+                timeout=Config.AGENT_MAX_EXECUTION_TIME)
             response = {
                 "success": result.get("success", False),
                 "answer": result.get("final_answer") or result.get("query_result", "No answer generated"),
@@ -871,16 +1998,36 @@ Query Results Summary:
                     "query_type": query_type,
                     "complexity": complexity,
                     "analysis_model": "gpt-4-turbo",
-                    "execution_model": "gpt-4o-mini"
+                    "execution_model": "gpt-4o-mini",
+                    "cache_hit_tokens": result.get("metadata", {}).get("cache_hit_tokens", 0)
                 },
                 "table_rows": result.get("query_rows", [])
             }
             if result.get("error_message"):
                 response["error"] = result["error_message"]
-            logger.info(f"✅ Query processing completed. Success: {response['success']}")
+            logger.info("✅ Query processing completed. Success: %s", response['success'])
             return response
+        except asyncio.TimeoutError:
+            logger.warning("⏱️ Query processing exceeded %ss: %s", Config.AGENT_MAX_EXECUTION_TIME, question)
+            return {
+                "success": False,
+                "answer": (
+                    f"I was unable to process your query within {Config.AGENT_MAX_EXECUTION_TIME:g} seconds. "
+                    "Please try a more specific question."
+                ),
+                "error": "Query processing timed out",
+                "metadata": {
+                    "session_id": session_id,
+                    "database": self.db_manager.db_name,
+                    "method": "langgraph",
+                    "original_question": question,
+                    "improved_question": improved_question,
+                    "analysis_model": "gpt-4-turbo",
+                    "execution_model": "gpt-4o-mini"
+                }
+            }
         except Exception as e:
-            logger.error(f"❌ Query processing failed: {e}")
+            logger.error("❌ Query processing failed: %s", e)
             return {
                 "success": False,
                 "answer": f"I encountered an error while processing your query: {str(e)}",
@@ -897,18 +2044,63 @@ Query Results Summary:
             }
     
     def get_table_schemas(self) -> Dict[str, Any]:
-        """Get table schema information using the database manager"""
-        return self.db_manager.get_table_info()
+        """Get table schema information, re-introspecting only when the DDL changes"""
+        if self._table_info is not None:
+            return self._table_info
+        db_name = self.db_manager.db_name
+        fingerprint = self.db_manager.get_schema_fingerprint()
+        self._schema_fingerprint = fingerprint
+        
+        with self._schemas_cache_lock:
+            cached = self._schemas_cache.get(db_name)
+            if cached:
+                self._schemas_cache.move_to_end(db_name)
+        if fingerprint is not None and cached and cached[0] == fingerprint:
+            self._table_info = cached[1]
+            return self._table_info
+        if fingerprint is not None and cached:
+            # DDL changed since the last agent saw this database - cached answers may be wrong
+            logger.info("🔄 Schema changed for %s, dropping cached responses", db_name)
+            self._clear_response_cache()
+        
+        table_info = self.db_manager.get_table_info()
+        if fingerprint is not None and table_info:
+            self._put_shared(self._schemas_cache, db_name, (fingerprint, table_info))
+            self._table_info = table_info
+        return table_info
+    
+    @classmethod
+    def _put_shared(cls, cache: "OrderedDict", key: str, value: Tuple):
+        """Insert into one of the shared LRU caches, evicting the least recently used database"""
+        with cls._schemas_cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > cls.SHARED_CACHE_SIZE:
+                cache.popitem(last=False)
+    
+    def invalidate_schema_cache(self):
+        """Drop cached schema information for this session database (e.g. after re-ingestion)"""
+        with self._schemas_cache_lock:
+            self._schemas_cache.pop(self.db_manager.db_name, None)
+            self._sql_prompts_cache.pop(self.db_manager.db_name, None)
+        self._schema_cache = None
+        self._sql_prompt = None
+        self._schema_fingerprint = None
+        self._table_info = None
+        self._clear_response_cache()
+    
+    def _clear_response_cache(self):
+        """Drop in-memory and persisted cached responses for this session database"""
+        response_cache.clear(self.db_manager.db_name)
+        if Config.PERSIST_RESPONSE_CACHE:
+            self.db_manager.clear_cached_responses()
     
     def close(self):
         """Close database connections - delegates to database manager"""
         if hasattr(self, 'db_manager') and self.db_manager:
             # Note: We don't close the db_manager here since it might be used elsewhere
             # The calling code (app4.py) should manage the db_manager lifecycle
-            logger.info(f"🔗 SQL Agent closed for session: {self.session_id}")
-        if hasattr(self, 'engine'):
-            self.engine.dispose()
-            logger.info("✅ SQLAlchemy engine disposed")
+            logger.info("🔗 SQL Agent closed for session: %s", self.session_id)
         logger.info("✅ SQL Agent connections cleaned up")
 
 
@@ -936,8 +2128,8 @@ def create_sql_agent(db_manager, session_id: str = None, max_attempts: int = 3,
         raise ValueError("db_manager is required and cannot be None")
     
     logger.info("🔧 Creating LangGraph-based SQL Agent with existing database manager")
-    logger.info(f"🗄️ Session database: {getattr(db_manager, 'db_name', 'unknown')}")
-    logger.info(f"🆔 Session ID: {session_id or 'default'}")
+    logger.info("🗄️ Session database: %s", getattr(db_manager, 'db_name', 'unknown'))
+    logger.info("🆔 Session ID: %s", session_id or 'default')
     
     return FlightDataPostgreSQLAgent(db_manager, session_id, max_attempts)
 
@@ -954,14 +2146,31 @@ class SQLGenerator:
         if not db_manager:
             raise ValueError("db_manager is required for session-based architecture")
         
-        self.agent = create_sql_agent(db_manager, session_id, 3)
+        self.db_manager = db_manager
+        self.session_id = session_id
+        self._agent: Optional[FlightDataPostgreSQLAgent] = None
+    
+    @property
+    def agent(self) -> FlightDataPostgreSQLAgent:
+        """Build the underlying agent on first use"""
+        if self._agent is None:
+            self._agent = create_sql_agent(self.db_manager, self.session_id, 3)
+        return self._agent
     
     def generate_sql(self, natural_query: str, table_schemas: Dict[str, List[Dict]] = None, 
                     context: Optional[str] = None) -> Tuple[str, Dict]:
         """Legacy method for backward compatibility"""
         
         result = self.agent.process_query(natural_query)
-        
+        return self._to_legacy_result(result)
+    
+    def generate_sql_batch(self, natural_queries: List[str]) -> List[Tuple[str, Dict]]:
+        """Legacy-format results for several questions, processed concurrently"""
+        results = self.agent.process_queries(natural_queries, max_concurrency=min(8, len(natural_queries) or 1))
+        return [self._to_legacy_result(result) for result in results]
+    
+    @staticmethod
+    def _to_legacy_result(result: Dict[str, Any]) -> Tuple[str, Dict]:
         if result["success"]:
             sql_query = result["metadata"].get("sql_query", "")
             return sql_query, result["metadata"]
@@ -1025,13 +2234,13 @@ if __name__ == "__main__":
             ]
             
             print(f"\n🔬 Testing dual LLM workflow...")
-            for question in test_questions:
+            # Independent questions - overlap their LLM round-trips
+            results = agent.process_queries(test_questions, max_concurrency=4)
+            for question, result in zip(test_questions, results):
                 print(f"\n" + "-" * 60)
                 print(f"❓ Question: {question}")
                 print(f"-" * 60)
                 
-                result = agent.process_query(question)
-                
                 print(f"📊 Success: {result['success']}")
                 if result['success']:
                     print(f"💬 Answer: {result['answer'][:200]}...")
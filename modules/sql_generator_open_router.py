@@ -37,13 +37,23 @@ Dependencies: openai (for OpenRouter), pandas, psycopg2, config
 import os
 import json
 import logging
+import threading
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
 # OpenAI client (works with OpenRouter)
+import httpx
 from openai import OpenAI
 
+# HTTP/2 needs the optional h2 package; plain keep-alive HTTP/1.1 otherwise
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
 from config import Config
+from modules.database import dumps_json
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +76,30 @@ def get_openrouter_api_key(key: str = "OPENROUTER_API_KEY") -> str:
     return api_key
 
 
+# Agents are created per chat request; share one client (and its pooled,
+# already TLS-handshaken connections) per API key instead of building a new
+# HTTP client each time
+_CLIENTS: Dict[str, OpenAI] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_openrouter_client(api_key: str) -> OpenAI:
+    """Get the shared OpenRouter client for an API key"""
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                base_url="https://openrouter.ai/api/v1",
+                http_client=httpx.Client(
+                    http2=_HTTP2_AVAILABLE,
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+                )
+            )
+            _CLIENTS[api_key] = client
+        return client
+
+
 # ============================================================================
 # TOOL/FUNCTION DEFINITIONS (OpenAI Format for OpenRouter)
 # ============================================================================
@@ -272,10 +306,7 @@ class OpenRouterFlightDataAgent:
 
         # Initialize OpenAI client pointing to OpenRouter
         api_key = get_openrouter_api_key(key)
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url="https://openrouter.ai/api/v1"
-        )
+        self.client = get_openrouter_client(api_key)
 
         # Model configuration
         self.model = model or Config.OPENROUTER_MODEL
@@ -286,6 +317,19 @@ class OpenRouterFlightDataAgent:
         # Tool definitions
         self.tools = create_tool_definitions()
 
+        # Tool name -> handler(args), one dict lookup per function call
+        self._tool_handlers = {
+            "run_sql": lambda args: self._run_sql(args.get("sql", "")),
+            "get_database_schema": lambda args: self._get_database_schema(),
+            "get_table_info": lambda args: self._get_table_info(args.get("table_name", "")),
+            "get_sample_rows": lambda args: self._get_sample_rows(args.get("table_name", ""), args.get("limit", 5)),
+            "generate_table_summary": lambda args: self._generate_table_summary(args.get("table_name", "")),
+            "compute_fuel_statistics": lambda args: self._compute_fuel_statistics(),
+            "compute_route_statistics": lambda args: self._compute_route_statistics(args.get("limit", 10)),
+            "compute_aircraft_statistics": lambda args: self._compute_aircraft_statistics(),
+            "validate_sql_query": lambda args: self._validate_sql_query(args.get("sql", "")),
+        }
+
         # Detect cache support (Anthropic Claude and Google Gemini support cache_control)
         self.supports_cache_control = self._check_cache_support()
 
@@ -296,6 +340,10 @@ class OpenRouterFlightDataAgent:
         self.last_sql_query = None
         self.last_sql_rows = []
 
+        # Table info (columns + row counts) for this session, read once and
+        # reused by the schema tools for the rest of the conversation
+        self._table_info: Optional[Dict[str, Any]] = None
+
         # Build cached system message once
         self.system_message = None
         self._initialize_system_message()
@@ -476,11 +524,20 @@ RESPONSE FORMAT:
                 "rows": []
             }
 
+    def _load_table_info(self) -> Dict[str, Any]:
+        """Get table info once per agent (session tables do not change mid-conversation)"""
+        if self._table_info is None:
+            table_info = self.db_manager.get_table_info()
+            if not table_info:
+                return table_info
+            self._table_info = table_info
+        return self._table_info
+
     def _get_database_schema(self) -> Dict[str, Any]:
         """Get complete database schema information"""
         try:
             schema_info = {}
-            table_info = self.db_manager.get_table_info()
+            table_info = self._load_table_info()
 
             for table_name, info in table_info.items():
                 columns = []
@@ -510,7 +567,7 @@ RESPONSE FORMAT:
     def _get_table_info(self, table_name: str) -> Dict[str, Any]:
         """Get detailed information about a specific table"""
         try:
-            table_info = self.db_manager.get_table_info()
+            table_info = self._load_table_info()
 
             if table_name not in table_info:
                 return {
@@ -542,14 +599,15 @@ RESPONSE FORMAT:
     def _get_sample_rows(self, table_name: str, limit: int = 5) -> Dict[str, Any]:
         """Get sample rows from a table"""
         try:
-            sql = f'SELECT * FROM "{table_name}" LIMIT {limit}'
-            data, error = self.db_manager.execute_query(sql)
-
-            if error:
+            # Table name and limit come from the model: check the name against
+            # the known tables and let the manager quote it (read-only connection)
+            if table_name not in self._load_table_info():
                 return {
                     "success": False,
-                    "error": error
+                    "error": f"Table '{table_name}' not found"
                 }
+            limit = min(max(int(limit), 1), 100)
+            data = self.db_manager.get_table_samples([table_name], limit).get(table_name, [])
 
             return {
                 "success": True,
@@ -614,7 +672,7 @@ RESPONSE FORMAT:
     def _compute_route_statistics(self, limit: int = 10) -> Dict[str, Any]:
         """Compute route statistics"""
         try:
-            sql = f'''
+            sql = '''
                 SELECT
                     "Origin ICAO" || ' -> ' || "Destination ICAO" as route,
                     COUNT(*) as flight_count,
@@ -622,10 +680,10 @@ RESPONSE FORMAT:
                 FROM clean_flights
                 GROUP BY "Origin ICAO", "Destination ICAO"
                 ORDER BY flight_count DESC
-                LIMIT {limit}
+                LIMIT %(limit)s
             '''
 
-            data, error = self.db_manager.execute_query(sql)
+            data, error = self.db_manager.execute_query(sql, {"limit": min(max(int(limit), 1), 1000)})
 
             if error:
                 return {"success": False, "error": error}
@@ -702,27 +760,9 @@ RESPONSE FORMAT:
         logger.info(f"[Function Call] {function_name} with args: {function_args}")
 
         # Dispatch to appropriate function
-        if function_name == "run_sql":
-            result = self._run_sql(function_args.get("sql", ""))
-        elif function_name == "get_database_schema":
-            result = self._get_database_schema()
-        elif function_name == "get_table_info":
-            result = self._get_table_info(function_args.get("table_name", ""))
-        elif function_name == "get_sample_rows":
-            result = self._get_sample_rows(
-                function_args.get("table_name", ""),
-                function_args.get("limit", 5)
-            )
-        elif function_name == "generate_table_summary":
-            result = self._generate_table_summary(function_args.get("table_name", ""))
-        elif function_name == "compute_fuel_statistics":
-            result = self._compute_fuel_statistics()
-        elif function_name == "compute_route_statistics":
-            result = self._compute_route_statistics(function_args.get("limit", 10))
-        elif function_name == "compute_aircraft_statistics":
-            result = self._compute_aircraft_statistics()
-        elif function_name == "validate_sql_query":
-            result = self._validate_sql_query(function_args.get("sql", ""))
+        handler = self._tool_handlers.get(function_name)
+        if handler is not None:
+            result = handler(function_args)
         else:
             result = {
                 "success": False,
@@ -822,7 +862,7 @@ RESPONSE FORMAT:
                     self.messages.append({
                         "role": "tool",
                         "tool_call_id": tool_call.id,
-                        "content": json.dumps(result, default=str)
+                        "content": dumps_json(result)
                     })
 
                 # Build message list again (must include tools in every request!)
@@ -0,0 +1,192 @@
+"""
+Tests for the agent response cache
+
+Covers exact and semantic lookups, per-database namespacing, TTL expiry
+and size bounds. Embeddings are stubbed so no OpenAI calls are made.
+"""
+
+import time
+
+import pytest
+import numpy as np
+
+from modules.response_cache import ResponseCache, normalize_question
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+QUESTION_VECTORS = {
+    "top 10 aircraft by fuel": [1.0, 0.0, 0.0],
+    "top ten aircraft by fuel usage": [0.99, 0.1, 0.0],
+    "what are the errors?": [0.0, 1.0, 0.0],
+}
+
+@pytest.fixture
+def cache():
+    """Cache with a deterministic embedding stub"""
+    cache = ResponseCache(maxsize=2, ttl=3600, threshold=0.95)
+
+    def fake_embed(question):
+        vector = np.asarray(QUESTION_VECTORS.get(question, [0.0, 0.0, 1.0]), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    cache._embed = fake_embed
+    return cache
+
+@pytest.fixture
+def sample_response():
+    return {"success": True, "answer": "N12345 used the most fuel", "metadata": {"sql_query": "SELECT 1"}}
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+def test_normalize_question():
+    assert normalize_question("  Top 10   Aircraft\tby FUEL ") == "top 10 aircraft by fuel"
+
+def test_exact_hit(cache, sample_response):
+    response, embedding = cache.lookup("session_a", "top 10 aircraft by fuel")
+    assert response is None
+    cache.store("session_a", "top 10 aircraft by fuel", sample_response, embedding)
+
+    response, _ = cache.lookup("session_a", "TOP 10 aircraft  by fuel")
+    assert response["answer"] == sample_response["answer"]
+    assert response["metadata"]["cache_hit"] is True
+    assert response["metadata"]["cache_tier"] == "exact"
+
+def test_semantic_hit(cache, sample_response):
+    _, embedding = cache.lookup("session_a", "top 10 aircraft by fuel")
+    cache.store("session_a", "top 10 aircraft by fuel", sample_response, embedding)
+
+    response, _ = cache.lookup("session_a", "top ten aircraft by fuel usage")
+    assert response["metadata"]["cache_tier"] == "semantic"
+
+    response, _ = cache.lookup("session_a", "what are the errors?")
+    assert response is None
+
+def test_namespaces_are_isolated(cache, sample_response):
+    _, embedding = cache.lookup("session_a", "top 10 aircraft by fuel")
+    cache.store("session_a", "top 10 aircraft by fuel", sample_response, embedding)
+
+    response, _ = cache.lookup("session_b", "top 10 aircraft by fuel")
+    assert response is None
+
+def test_failed_responses_are_not_cached(cache):
+    cache.store("session_a", "top 10 aircraft by fuel", {"success": False, "answer": "error"})
+    response, _ = cache.lookup("session_a", "top 10 aircraft by fuel")
+    assert response is None
+
+def test_hits_are_copies(cache, sample_response):
+    cache.store("session_a", "top 10 aircraft by fuel", sample_response)
+    response, _ = cache.lookup("session_a", "top 10 aircraft by fuel")
+    response["metadata"]["session_id"] = "mutated"
+
+    response, _ = cache.lookup("session_a", "top 10 aircraft by fuel")
+    assert "session_id" not in response["metadata"]
+
+def test_semantic_store_is_bounded(cache, sample_response):
+    for question in QUESTION_VECTORS:
+        _, embedding = cache.lookup("session_a", question)
+        cache.store("session_a", question, sample_response, embedding)
+    assert len(cache._entries["session_a"]) == cache.maxsize
+    assert cache._vectors["session_a"].shape[0] == cache.maxsize
+
+def test_split_lookups(cache, sample_response):
+    embedding = cache._embed("top 10 aircraft by fuel")
+    cache.store("session_a", "top 10 aircraft by fuel", sample_response, embedding)
+
+    assert cache.lookup_exact("session_a", "top ten aircraft by fuel usage") is None
+    response = cache.lookup_semantic("session_a", "top ten aircraft by fuel usage",
+                                     cache._embed("top ten aircraft by fuel usage"))
+    assert response["metadata"]["cache_tier"] == "semantic"
+    assert cache.lookup_semantic("session_a", "anything", None) is None
+
+def test_warm_from_persisted_entries(cache, sample_response):
+    assert cache.claim_warmup("session_a") is True
+    assert cache.claim_warmup("session_a") is False
+
+    cache.warm("session_a", [
+        ("top 10 aircraft by fuel", QUESTION_VECTORS["top 10 aircraft by fuel"], sample_response, time.time()),
+        ("what are the errors?", None, sample_response, time.time() - 2 * cache.ttl),
+    ])
+    response, _ = cache.lookup("session_a", "top ten aircraft by fuel usage")
+    assert response["metadata"]["cache_tier"] == "semantic"
+    response, _ = cache.lookup("session_a", "what are the errors?")
+    assert response is None
+
+def test_warm_keeps_entries_oldest_first(cache, sample_response):
+    _, embedding = cache.lookup("session_a", "top 10 aircraft by fuel")
+    cache.store("session_a", "top 10 aircraft by fuel", sample_response, embedding)
+
+    cache.warm("session_a", [
+        ("what are the errors?", QUESTION_VECTORS["what are the errors?"], sample_response, time.time() - 60),
+        ("top 10 aircraft by fuel", QUESTION_VECTORS["top 10 aircraft by fuel"], sample_response, time.time() - 120),
+    ])
+    entries = cache._entries["session_a"]
+    assert [question for _, question, _ in entries] == ["what are the errors?", "top 10 aircraft by fuel"]
+    assert entries[0][0] < entries[1][0]
+    assert len(cache._vectors["session_a"]) == len(entries)
+
+def test_near_match_requires_verification(sample_response):
+    cache = ResponseCache(maxsize=8, ttl=3600, threshold=0.999, verify_threshold=0.9)
+    cache._embed = lambda question: np.asarray(QUESTION_VECTORS[question], dtype=np.float32) / np.linalg.norm(QUESTION_VECTORS[question])
+    embedding = cache._embed("top 10 aircraft by fuel")
+    cache.store("session_a", "top 10 aircraft by fuel", sample_response, embedding)
+
+    near = cache._embed("top ten aircraft by fuel usage")
+    assert cache.lookup_semantic("session_a", "top ten aircraft by fuel usage", near) is None
+    assert cache.lookup_semantic("session_a", "top ten aircraft by fuel usage", near,
+                                 verify=lambda cached, new: False) is None
+
+    seen = []
+    response = cache.lookup_semantic("session_a", "top ten aircraft by fuel usage", near,
+                                     verify=lambda cached, new: seen.append((cached, new)) or True)
+    assert response["metadata"]["cache_tier"] == "semantic_verified"
+    assert seen == [("top 10 aircraft by fuel", "top ten aircraft by fuel usage")]
+
+def test_different_parameters_are_not_direct_hits(sample_response):
+    cache = ResponseCache(maxsize=8, ttl=3600, threshold=0.95, verify_threshold=0.85)
+    vectors = {
+        "top 5 aircraft by fuel consumption": [1.0, 0.0],
+        "top 10 aircraft by fuel consumption": [0.99, 0.141],
+        "flights from EGLL to LFPG": [1.0, 0.0],
+        "flights from EGLL to EDDF": [0.99, 0.141],
+    }
+    cache._embed = lambda question: np.asarray(vectors[question], dtype=np.float32) / np.linalg.norm(vectors[question])
+
+    for cached_question, question in [("top 5 aircraft by fuel consumption", "top 10 aircraft by fuel consumption"),
+                                      ("flights from EGLL to LFPG", "flights from EGLL to EDDF")]:
+        cache.clear()
+        cache.store("session_a", cached_question, sample_response, cache._embed(cached_question))
+        embedding = cache._embed(question)
+        assert float(embedding @ cache._embed(cached_question)) >= 0.99
+        assert cache.lookup_semantic("session_a", question, embedding) is None
+        assert cache.lookup_semantic("session_a", question, embedding, verify=lambda cached, new: True) is None
+
+def test_near_match_with_different_parameters_is_not_verified(sample_response):
+    cache = ResponseCache(maxsize=8, ttl=3600, threshold=0.999, verify_threshold=0.5)
+    vectors = {"top 5 aircraft by fuel": [1.0, 0.0], "top 10 aircraft by fuel": [0.9, 0.436]}
+    cache._embed = lambda question: np.asarray(vectors[question], dtype=np.float32) / np.linalg.norm(vectors[question])
+    cache.store("session_a", "top 5 aircraft by fuel", sample_response, cache._embed("top 5 aircraft by fuel"))
+
+    seen = []
+    assert cache.lookup_semantic("session_a", "top 10 aircraft by fuel", cache._embed("top 10 aircraft by fuel"),
+                                 verify=lambda cached, new: seen.append(cached) or True) is None
+    assert seen == []
+
+def test_similar_sql_examples(cache):
+    cache.maxsize = 8
+    for index, question in enumerate(QUESTION_VECTORS):
+        response = {"success": True, "answer": "...", "metadata": {"sql_query": f"SELECT {index}"}}
+        cache.store("session_a", question, response, cache._embed(question))
+    cache.store("session_a", "no sql", {"success": True, "answer": "summary", "metadata": {}},
+                cache._embed("top 10 aircraft by fuel"))
+
+    query = cache._embed("top 10 aircraft by fuel")
+    examples = cache.similar_sql_examples("session_a", query, k=3, min_similarity=0.5)
+    assert examples == [("top 10 aircraft by fuel", "SELECT 0"),
+                        ("top ten aircraft by fuel usage", "SELECT 1")]
+    assert cache.similar_sql_examples("session_a", query, k=1, min_similarity=0.5) == [
+        ("top 10 aircraft by fuel", "SELECT 0")]
+    assert cache.similar_sql_examples("session_a", None, k=3, min_similarity=0.5) == []
@@ -0,0 +1,180 @@
+"""
+Tests for the SQL agent's local helpers
+
+Covers generated-SQL validation, canned question templates, model-written
+answer templates, direct answers and the relevance gate. These run without an LLM or a
+database; embeddings are stubbed.
+"""
+
+import asyncio
+from decimal import Decimal
+
+import pytest
+import numpy as np
+
+from modules import sql_generator
+from modules.response_cache import response_cache
+from modules.sql_generator import (
+    ais_flight_data_question,
+    compact_sample_rows,
+    format_direct_answer,
+    match_sql_template,
+    render_answer_template,
+    validate_generated_sql,
+)
+
+# ============================================================================
+# SQL VALIDATION
+# ============================================================================
+
+@pytest.mark.parametrize("sql_query", [
+    "SELECT 1",
+    "WITH t AS (SELECT 1 AS x) SELECT x FROM t",
+    "SELECT 1 UNION SELECT 2",
+    "SELECT 1 EXCEPT SELECT 2",
+    "SELECT 1 INTERSECT SELECT 1",
+    "(SELECT 1)",
+    "```sql\nSELECT 1;\n```",
+])
+def test_read_queries_are_accepted(sql_query):
+    validated, error = validate_generated_sql(sql_query, default_limit=50)
+    assert error is None
+    assert validated.endswith("LIMIT 50")
+
+def test_existing_limit_is_kept():
+    validated, error = validate_generated_sql("(SELECT 1) LIMIT 5", default_limit=50)
+    assert error is None
+    assert validated == "(SELECT 1) LIMIT 5"
+
+@pytest.mark.parametrize("sql_query", [
+    "DELETE FROM clean_flights",
+    "DROP TABLE clean_flights",
+    "SELECT * INTO copy FROM clean_flights",
+    "WITH d AS (DELETE FROM clean_flights RETURNING *) SELECT * FROM d",
+    "WITH u AS (UPDATE clean_flights SET \"Flight\" = 'X' RETURNING *) SELECT * FROM u",
+    "SELECT 1; SELECT 2",
+])
+def test_writes_are_rejected(sql_query):
+    validated, error = validate_generated_sql(sql_query, default_limit=50)
+    assert validated is None
+    assert error
+
+# ============================================================================
+# CANNED TEMPLATES
+# ============================================================================
+
+def test_top_aircraft_template():
+    name, sql_query, params, _ = match_sql_template("  Top 10 aircraft by fuel consumption? ")
+    assert name == "top_aircraft_by_fuel"
+    assert params == ["10"]
+    assert sql_query.endswith("LIMIT 10")
+
+def test_route_template():
+    name, sql_query, params, _ = match_sql_template("Show me flights from EGLL to LFPG")
+    assert name == "flights_between_airports"
+    assert params == ["EGLL", "LFPG"]
+    assert "'EGLL'" in sql_query and "'LFPG'" in sql_query
+
+def test_average_fuel_template():
+    name, _, params, _ = match_sql_template("What is the average fuel consumption per aircraft type?")
+    assert name == "average_fuel_by_aircraft_type"
+    assert params == []
+
+def test_route_template_orders_chronologically():
+    sqlglot = pytest.importorskip("sqlglot")
+    _, sql_query, _, _ = match_sql_template("flights from EGLL to LFPG")
+    order = sqlglot.parse_one(sql_query, read="postgres").args["order"].expressions[0].this
+    # "Date" is dd/mm/yyyy text: it must be parsed, not sorted as a string
+    assert isinstance(order, sqlglot.exp.StrToDate)
+    assert order.this.name == "Date"
+    assert order.args["format"].name == "%d/%m/%Y"
+
+@pytest.mark.parametrize("question", [
+    "top 5 aircraft with the lowest fuel",
+    "top 10 aircraft by fuel efficiency in March 2024",
+    "flights from EGLL to LFPG in 2023",
+    "flights from Rome to Oslo",
+    "average fuel per hour by aircraft type",
+    "average fuel by aircraft type in 2023",
+])
+def test_qualified_questions_fall_through(question):
+    assert match_sql_template(question) is None
+
+# ============================================================================
+# ANSWER TEMPLATES
+# ============================================================================
+
+def test_answer_template_renders():
+    rendered = render_answer_template("{{ row_count }} flights, first {{ rows[0].flight }}", [{"flight": "AA100"}])
+    assert rendered == "1 flights, first AA100"
+
+@pytest.mark.parametrize("answer_template", [
+    "Total fuel: {{ rows[0].total_fuel }}",
+    "{{ missing }}",
+    "{{ rows.__class__ }}",
+    "{% if %}",
+])
+def test_bad_answer_templates_fall_back(answer_template):
+    assert render_answer_template(answer_template, [{"flight": "AA100"}]) is None
+
+# ============================================================================
+# DIRECT ANSWERS
+# ============================================================================
+
+def test_direct_answer_groups_only_aggregates():
+    rows = [{"year": 2024, "flight_count": 12345, "avg_fuel": Decimal("1234.5")}]
+    assert format_direct_answer("flights in 2024", rows) == "year: 2024, flight count: 12,345, avg fuel: 1,234.50"
+
+def test_direct_answer_needs_llm_for_wide_results():
+    assert format_direct_answer("q", [{"a": 1, "b": 2, "c": 3, "d": 4}]) is None
+    assert format_direct_answer("q", [{"a": 1}, {"a": 2}]) is None
+    assert format_direct_answer("q", []) == "No results found for: q"
+
+def test_compact_sample_rows():
+    rows = [
+        {"Flight": "AA100", "Remarks": None, "Notes": "x" * 300},
+        {"Flight": "AA101", "Remarks": None, "Notes": "short"},
+    ]
+    compacted = compact_sample_rows(rows, max_chars=10)
+    assert compacted == [
+        {"Flight": "AA100", "Notes": "x" * 10 + "…"},
+        {"Flight": "AA101", "Notes": "short"},
+    ]
+    assert rows[0]["Notes"] == "x" * 300
+    assert compact_sample_rows([]) == []
+
+# ============================================================================
+# RELEVANCE GATE
+# ============================================================================
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Stub the cache embedder: prototypes point one way, other text another; records calls"""
+    calls = []
+
+    def fake_embed(question):
+        calls.append(question)
+        if question in sql_generator.RELEVANCE_PROTOTYPES:
+            return np.array([1.0, 0.0], dtype=np.float32)
+        return np.array([0.0, 1.0], dtype=np.float32)
+
+    monkeypatch.setattr(response_cache, "_embed", fake_embed)
+    monkeypatch.setattr(sql_generator, "_relevance_centroid", None)
+    return calls
+
+def test_flight_vocabulary_skips_embedding(embedded):
+    assert asyncio.run(ais_flight_data_question("Which aircraft burned the most FUEL?")) is True
+    assert embedded == []
+
+def test_unrelated_question_is_below_threshold(embedded):
+    assert asyncio.run(ais_flight_data_question("Write me a poem about the sea")) is False
+    assert "Write me a poem about the sea" in embedded
+
+def test_existing_embedding_is_reused(embedded):
+    async def gate():
+        embedding_task = asyncio.get_running_loop().create_future()
+        embedding_task.set_result(np.array([0.8, 0.6], dtype=np.float32))
+        return await ais_flight_data_question("Anything unusual last week?", embedding_task)
+
+    assert asyncio.run(gate()) is True
+    assert "Anything unusual last week?" not in embedded